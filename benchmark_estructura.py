@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Benchmark de estructura_carpetas.py sobre árboles sintéticos.
+
+Genera árboles en un directorio temporal (anidación profunda, carpetas muy
+anchas, carpetas de imágenes y secuencias con prefijo numerado), mide cada
+fase por separado (recorrido, clasificación/condensación, renderizado de las
+líneas con iter_tree_lines y escritura con write_lines), además de
+generate_directory_tree completo y en modo streaming, y guarda los
+resultados en JSON para comparar ejecuciones.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from estructura_carpetas import (
+    NoteMatcher,
+    classify_tree,
+    generate_directory_tree,
+    iter_tree_lines,
+    walk_directory_tree,
+    write_lines,
+)
+
+SHAPES = ('deep', 'wide', 'images', 'sequences')
+
+CODE_EXTENSIONS = ['.js', '.jsx', '.css', '.json', '.md']
+IMAGE_EXTENSIONS = ['.png', '.webp', '.svg', '.jpg']
+WORDS = ['Button', 'Modal', 'index', 'use-auth', 'Card', 'Header', 'utils', 'store', 'Node', 'Panel']
+
+def _touch(path):
+    """Crea un archivo vacío"""
+    with open(path, 'wb'):
+        pass
+
+def _random_name(rng, extensions):
+    """Nombre de archivo con aspecto de componente o módulo"""
+    return f"{rng.choice(WORDS)}{rng.randrange(100000)}{rng.choice(extensions)}"
+
+def _directories_for(shape, total_files):
+    """
+    Reparte los archivos en directorios según la forma del árbol.
+    Devuelve una lista de (ruta relativa, nombres de archivo).
+    """
+    rng = random.Random(total_files)
+    layout = []
+    
+    if shape == 'deep':
+        # Cadenas de 40 niveles con pocos archivos por nivel
+        depth, per_dir = 40, 5
+        chains = max(1, total_files // (depth * per_dir))
+        for chain in range(chains):
+            path = f"chain{chain}"
+            for level in range(depth):
+                path = os.path.join(path, f"level{level}")
+                layout.append((path, [_random_name(rng, CODE_EXTENSIONS) for _ in range(per_dir)]))
+    
+    elif shape == 'wide':
+        # Pocas carpetas con miles de archivos cada una
+        folders = max(1, total_files // 5000)
+        for folder in range(folders):
+            count = total_files // folders
+            layout.append((f"wide{folder}", [_random_name(rng, CODE_EXTENSIONS) for _ in range(count)]))
+    
+    elif shape == 'images':
+        # Carpetas de recursos donde is_image_directory es cierto
+        per_dir = 200
+        for folder in range(max(1, total_files // per_dir)):
+            names = [_random_name(rng, IMAGE_EXTENSIONS) for _ in range(per_dir - 10)]
+            names += [_random_name(rng, CODE_EXTENSIONS) for _ in range(10)]
+            layout.append((os.path.join('public', f"assets{folder // 50}", f"img{folder}"), names))
+    
+    elif shape == 'sequences':
+        # Secuencias chunk-0001.js, frame-0002.png... que agrupa analyze_patterns
+        per_dir = 300
+        for folder in range(max(1, total_files // per_dir)):
+            prefixes = rng.sample(['chunk', 'frame', 'vendor', 'page', 'locale'], 3)
+            names = [f"{prefixes[i % 3]}-{i:04d}{rng.choice(CODE_EXTENSIONS)}" for i in range(per_dir)]
+            layout.append((os.path.join('build', f"seq{folder}"), names))
+    
+    else:
+        raise ValueError(f"Forma de árbol desconocida: {shape}")
+    
+    return layout
+
+def make_synthetic_tree(root, shape, total_files):
+    """Crea un árbol sintético bajo root; devuelve (archivos, directorios) creados"""
+    files = dirs = 0
+    seen = set()
+    for rel_path, names in _directories_for(shape, total_files):
+        path = os.path.join(root, rel_path)
+        os.makedirs(path, exist_ok=True)
+        dirs += 1
+        for name in names:
+            if (rel_path, name) in seen:
+                continue
+            seen.add((rel_path, name))
+            _touch(os.path.join(path, name))
+            files += 1
+    return files, dirs
+
+def _measure(phases, name, func, trace_memory):
+    """Ejecuta una fase y guarda su tiempo de reloj, de CPU y (si se pide) su pico de memoria"""
+    if trace_memory:
+        tracemalloc.reset_peak()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    result = func()
+    phases[name] = {
+        'wall_seconds': round(time.perf_counter() - wall, 6),
+        'cpu_seconds': round(time.process_time() - cpu, 6),
+    }
+    if trace_memory:
+        phases[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    return result
+
+def _count_lines(path):
+    """Líneas de un archivo de salida"""
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+
+def run_phases(root, output_file, threshold, trace_memory=False):
+    """
+    Ejecuta por separado las fases de generate_directory_tree sobre un árbol
+    y después la función completa, en memoria y en streaming, tal como se
+    usan desde la línea de comandos.
+    """
+    phases = {}
+    notes = NoteMatcher({r'index\.js$': 'nota'})
+    
+    node = _measure(phases, 'walk', lambda: walk_directory_tree(root, []), trace_memory)
+    _measure(phases, 'classify', lambda: classify_tree(node, threshold), trace_memory)
+    
+    # Renderizado y escritura por separado: las líneas se materializan antes de escribirlas
+    lines = _measure(phases, 'render', lambda: list(iter_tree_lines(node, '', notes, threshold)), trace_memory)
+    
+    def write():
+        with open(output_file, 'w', encoding='utf-8') as f:
+            write_lines(f, lines)
+    _measure(phases, 'write', write, trace_memory)
+    
+    del node, lines
+    
+    def generate(streaming):
+        # generate_directory_tree informa por stdout de cada archivo escrito
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_directory_tree(root, output_file, [], notes, threshold, streaming=streaming)
+    _measure(phases, 'generate', lambda: generate(False), trace_memory)
+    _measure(phases, 'stream', lambda: generate(True), trace_memory)
+    
+    return phases, _count_lines(output_file)
+
+def run_benchmark(shapes, sizes, threshold, workdir=None, trace_memory=True):
+    """Genera cada combinación de forma y tamaño, la mide y devuelve los resultados"""
+    results = []
+    base = tempfile.mkdtemp(prefix='estructura-bench-', dir=workdir)
+    try:
+        for shape in shapes:
+            for size in sizes:
+                root = os.path.join(base, f"{shape}-{size}")
+                files, dirs = make_synthetic_tree(root, shape, size)
+                output_file = os.path.join(base, f"{shape}-{size}.txt")
+                
+                # Las fases se cronometran sin tracemalloc, que ralentiza las asignaciones
+                phases, output_lines = run_phases(root, output_file, threshold)
+                if trace_memory:
+                    tracemalloc.start()
+                    memory, _ = run_phases(root, output_file, threshold, trace_memory=True)
+                    tracemalloc.stop()
+                    for name, values in memory.items():
+                        phases[name]['peak_bytes'] = values['peak_bytes']
+                
+                results.append({
+                    'shape': shape,
+                    'files': files,
+                    'dirs': dirs,
+                    'output_lines': output_lines,
+                    'output_bytes': os.path.getsize(output_file),
+                    'phases': phases,
+                })
+                print(f"{shape:10} {files:>9} archivos  " +
+                      "  ".join(f"{name}={values['wall_seconds']:.3f}s" for name, values in phases.items()))
+                shutil.rmtree(root)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de estructura_carpetas.py con árboles sintéticos")
+    parser.add_argument('-o', '--output', default='benchmark_estructura.json', help="Archivo JSON de resultados")
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES, default=list(SHAPES), help="Formas de árbol a medir")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help="Número aproximado de archivos por árbol (hasta 1000000)")
+    parser.add_argument('--threshold', type=int, default=8, help="Umbral de condensación")
+    parser.add_argument('--workdir', default=None, help="Directorio donde crear los árboles temporales")
+    parser.add_argument('--no-memory', action='store_true', help="No mide el pico de memoria con tracemalloc")
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.shapes, args.sizes, args.threshold, args.workdir, not args.no_memory)
+    
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'threshold': args.threshold,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"Resultados guardados en '{args.output}'")
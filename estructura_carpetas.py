@@ -4,209 +4,2781 @@ Script para generar una estructura de directorios condensada,
 agrupando archivos similares y directorios de imágenes para mejor visualización.
 """
 
+import argparse
+import contextlib
+import errno
+import hashlib
+import json
+import mmap
 import os
+import posixpath
+import queue
 import re
+import struct
+import sys
+import threading
+import time
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def add_note(line, notes):
-    """Añade una nota al final de la línea si existe en el diccionario de notas"""
+# Directorios que no se recorren si no se indica otra lista de exclusiones
+DEFAULT_EXCLUDE_DIRS = ('venv', '__pycache__', '.git', '.idea', 'node_modules', 'dist', 'build')
+
+_REGEX_SPECIAL = set('.^$*+?{}[]|()')
+
+def _parse_literal(pattern):
+    """
+    Reconoce patrones que son un texto literal, opcionalmente anclado al final
+    (por ejemplo 'App\\.jsx$'). Devuelve (literal, anclado) o (None, False).
+    """
+    chars = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            # Solo se aceptan escapes de puntuación (\. \- ...), no clases como \d o \b
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum() or pattern[i + 1] == '_':
+                return None, False
+            chars.append(pattern[i + 1])
+            i += 2
+            continue
+        if c == '$' and i == len(pattern) - 1:
+            return ''.join(chars), True
+        if c in _REGEX_SPECIAL:
+            return None, False
+        chars.append(c)
+        i += 1
+    return ''.join(chars), False
+
+class NoteMatcher:
+    """
+    Versión compilada del diccionario de notas.
+    
+    Conserva la semántica de add_note (gana el primer patrón, en orden, que
+    aparezca en la línea) pero compila las notas una sola vez:
+    - los sufijos literales ('App\\.jsx$') se buscan en diccionarios por
+      longitud, así que su coste no depende del número de notas;
+    - los literales sin ancla se comprueban con `in`;
+    - el resto se combina en una única expresión regular con una
+      alternativa por patrón, probadas en orden.
+    """
+    
+    def __init__(self, notes):
+        self.notes = list(notes.values())
+        self.suffixes = {}
+        self.literals = []
+        general = []
+        
+        for index, pattern in enumerate(notes):
+            literal, anchored = _parse_literal(pattern)
+            if literal is None:
+                general.append((index, pattern))
+            elif anchored and literal:
+                # Si un sufijo se repite, gana el primero
+                self.suffixes.setdefault(len(literal), {}).setdefault(literal, index)
+            else:
+                self.literals.append((index, literal))
+        
+        self.suffix_lengths = sorted(self.suffixes)
+        self.first_general = general[0][0] if general else len(self.notes)
+        self.general = [(index, re.compile(pattern)) for index, pattern in general]
+        self.combined, self.group_index = self._combine(general)
+    
+    def _combine(self, general):
+        """
+        Une los patrones generales en una sola regex anclada al inicio:
+        cada alternativa es un lookahead que busca su patrón en cualquier
+        posición, seguido de un grupo vacío que identifica la alternativa.
+        Devuelve (None, None) si algún patrón no admite combinarse.
+        """
+        if not general:
+            return None, None
+        
+        parts = []
+        group_index = {}
+        group = 0
+        for index, pattern in general:
+            # Las referencias hacia atrás cambiarían de número al combinar
+            if re.search(r'\\[1-9]|\(\?P=', pattern):
+                return None, None
+            group += re.compile(pattern).groups + 1
+            group_index[group] = index
+            parts.append(f"(?=(?s:.)*?(?:{pattern}))()")
+        
+        try:
+            return re.compile('|'.join(parts)), group_index
+        except re.error:
+            return None, None
+    
+    def match(self, line):
+        """Devuelve la nota del primer patrón que coincide con la línea, o None"""
+        best = len(self.notes)
+        
+        for length in self.suffix_lengths:
+            index = self.suffixes[length].get(line[-length:])
+            if index is not None and index < best:
+                best = index
+        
+        for index, literal in self.literals:
+            if index >= best:
+                break
+            if literal in line:
+                best = index
+                break
+        
+        if self.first_general < best:
+            if self.combined is not None:
+                m = self.combined.match(line)
+                if m:
+                    best = min(best, self.group_index[m.lastindex])
+            else:
+                for index, regex in self.general:
+                    if index >= best:
+                        break
+                    if regex.search(line):
+                        best = index
+                        break
+        
+        return self.notes[best] if best < len(self.notes) else None
+
+def match_note(line, notes):
+    """
+    Devuelve la nota que corresponde a la línea, o None.
+    Acepta el diccionario original o un NoteMatcher ya compilado.
+    """
+    if isinstance(notes, NoteMatcher):
+        return notes.match(line)
+    
     for pattern, note in notes.items():
         if re.search(pattern, line):
-            return f"{line} {note}"
-    return line
+            return note
+    return None
+
+def add_note(line, notes):
+    """Añade una nota al final de la línea si existe en el diccionario de notas"""
+    note = match_note(line, notes)
+    return f"{line} {note}" if note is not None else line
 
 def get_base_name(filename):
     """Extrae el nombre base del archivo sin la extensión"""
-    return os.path.splitext(filename)[0]
+    # Igual que os.path.splitext(filename)[0] para un nombre sin '/', sin su coste:
+    # los puntos iniciales ('.env', '..a') no cuentan como separador de extensión
+    dot = filename.rfind('.')
+    if dot > 0 and (filename[0] != '.' or filename[:dot].lstrip('.')):
+        return filename[:dot]
+    return filename
 
 def get_extension(filename):
     """Obtiene la extensión del archivo"""
     return os.path.splitext(filename)[1].lower()
 
-def is_image_file(filename):
-    """Determina si un archivo es una imagen basado en su extensión"""
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tiff'}
-    return get_extension(filename) in image_extensions
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tiff'}
+
+def is_image_file(filename):
+    """Determina si un archivo es una imagen basado en su extensión"""
+    return get_extension(filename) in IMAGE_EXTENSIONS
+
+def is_image_directory(files):
+    """Determina si un directorio contiene principalmente imágenes"""
+    if not files:
+        return False
+    
+    image_count = sum(1 for f in files if is_image_file(f))
+    return image_count / len(files) >= 0.5  # Si más del 50% son imágenes
+
+SEQUENCE_SEPARATORS = '-_'
+
+def sequence_pattern(base):
+    """
+    Separa el último elemento de secuencia de un nombre base en tiempo lineal.
+    
+    Reconoce un número final ('Icon12' -> 'Icon*', 'img_001' -> 'img_*') y, si no
+    lo hay, el último tramo tras '-' o '_' ('Home-arsenal' -> 'Home-*').
+    Devuelve (patrón, raíz); el patrón es None si el nombre no forma secuencia,
+    y en ese caso la raíz es el propio nombre.
+    """
+    end = len(base)
+    while end and base[end - 1].isdigit():
+        end -= 1
+    
+    if end < len(base):
+        # Termina en un número: la raíz es lo anterior, sin el separador
+        stem = base[:end - 1] if end and base[end - 1] in SEQUENCE_SEPARATORS else base[:end]
+        separator = base[end - 1] if end and base[end - 1] in SEQUENCE_SEPARATORS else ''
+    else:
+        cut = max(base.rfind(sep) for sep in SEQUENCE_SEPARATORS)
+        if cut <= 0:
+            return None, base
+        stem, separator = base[:cut], base[cut]
+    
+    if not stem:
+        return None, base
+    return f"{stem}{separator}*", stem
+
+class DirectoryAnalysis:
+    """
+    Agrupaciones de los archivos de un directorio, calculadas en una sola pasada
+    y compartidas por should_condense, analyze_patterns y condense_image_directory.
+    
+    by_extension: archivos por extensión (en minúsculas), en orden de aparición
+    sequences: archivos por patrón de secuencia ('img_*', 'Icon*', 'chunk-*')
+    stems: número de archivos por raíz (el nombre base si no forma secuencia)
+    image_count: número de imágenes
+    """
+    __slots__ = ('files', 'by_extension', 'sequences', 'stems', 'image_count')
+    
+    def __init__(self, files):
+        self.files = files
+        self.by_extension = defaultdict(list)
+        self.sequences = defaultdict(list)
+        self.stems = Counter()
+        self.image_count = 0
+        
+        for f in files:
+            base, ext = os.path.splitext(f)
+            ext = ext.lower()
+            self.by_extension[ext].append(f)
+            if ext in IMAGE_EXTENSIONS:
+                self.image_count += 1
+            
+            pattern, stem = sequence_pattern(base)
+            if pattern is not None:
+                self.sequences[pattern].append(f)
+            self.stems[stem] += 1
+
+def should_condense(files, threshold=10, is_img_dir=False, analysis=None):
+    """
+    Determina si un conjunto de archivos debe condensarse basado en patrones similares
+    y aplica un umbral más bajo para directorios de imágenes
+    """
+    # Umbral más bajo para directorios de imágenes
+    if is_img_dir:
+        threshold = min(threshold, 5)  # Aplica un umbral más bajo para imágenes
+    
+    if len(files) < threshold:
+        return False
+    
+    # Analizar patrones en los nombres de archivos
+    if analysis is None:
+        analysis = DirectoryAnalysis(files)
+    
+    # Si hay muchos archivos con la misma raíz o extensión, condensar
+    # (una raíz de un solo archivo no es un grupo)
+    return any(len(group) >= threshold/2 for group in analysis.by_extension.values()) or \
+           any(1 < count >= threshold/2 for count in analysis.stems.values())
+
+def scan_directory(path, sizes=None):
+    """
+    Lista un directorio con os.scandir y separa subdirectorios y archivos
+    con el mismo criterio que os.walk: los enlaces simbólicos a directorios
+    no se recorren, y cualquier entrada que no sea directorio cuenta como archivo.
+    Los nombres se devuelven en el orden en que los entrega el sistema.
+    
+    Si se pasa un diccionario en sizes, se rellena con el tamaño de cada
+    archivo tomado de DirEntry.stat() durante el mismo listado.
+    """
+    dirs = []
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            
+            if not is_dir:
+                files.append(entry.name)
+                if sizes is not None:
+                    try:
+                        sizes[entry.name] = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        sizes[entry.name] = 0
+                continue
+            
+            # os.walk no desciende en enlaces a directorios, así que nunca aparecen
+            try:
+                is_link = entry.is_symlink()
+            except OSError:
+                is_link = False
+            if not is_link:
+                dirs.append(entry.name)
+    return dirs, files
+
+def _translate_glob_segment(segment):
+    """Traduce un componente de un patrón .gitignore (sin '/') a expresión regular"""
+    regex = []
+    i = 0
+    while i < len(segment):
+        c = segment[i]
+        if c == '\\' and i + 1 < len(segment):
+            regex.append(re.escape(segment[i + 1]))
+            i += 2
+            continue
+        if c == '*':
+            regex.append('[^/]*')
+        elif c == '?':
+            regex.append('[^/]')
+        elif c == '[':
+            # Clase de caracteres; ']' justo tras '[' o '[!' es literal
+            j = i + 1
+            if j < len(segment) and segment[j] in '!^':
+                j += 1
+            if j < len(segment) and segment[j] == ']':
+                j += 1
+            j = segment.find(']', j)
+            if j == -1:
+                regex.append('\\[')
+            else:
+                body = segment[i + 1:j]
+                negate = body[:1] in ('!', '^')
+                if negate:
+                    body = body[1:]
+                body = ''.join('\\' + ch if ch in '\\[]^' else ch for ch in body)
+                regex.append(f"[{'^' if negate else ''}{body}]")
+                i = j
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return ''.join(regex)
+
+def _gitignore_line_to_regex(line):
+    """
+    Convierte una línea de .gitignore en (regex, negada, solo directorios)
+    o None si la línea no define ningún patrón.
+    """
+    if not line or line.startswith('#'):
+        return None
+    
+    # Los espacios finales se ignoran salvo que estén escapados
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    elif line.startswith(('\\!', '\\#')):
+        line = line[1:]
+    
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    
+    # Un '/' al principio o en medio ancla el patrón al directorio del .gitignore
+    anchored = '/' in line
+    parts = line.lstrip('/').split('/')
+    
+    regex = ''
+    for i, part in enumerate(parts):
+        is_last = i == len(parts) - 1
+        if part == '**':
+            # '**/' es cualquier número de directorios; '/**' final, todo lo que hay dentro
+            regex += '.+' if is_last else '(?:.*/)?'
+        else:
+            regex += _translate_glob_segment(part) + ('' if is_last else '/')
+    
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return regex, negate, dir_only
+
+class GitIgnoreRules:
+    """
+    Reglas de un archivo .gitignore compiladas en un matcher por directorio.
+    
+    Todas las reglas se combinan en una sola expresión regular, con las
+    alternativas en orden inverso para que gane la última regla que
+    coincide, como en git. Hay una variante para directorios (todas las
+    reglas) y otra para archivos (sin las reglas que terminan en '/').
+    """
+    
+    def __init__(self, lines, base=''):
+        self.base = base
+        self.digest = hashlib.sha1('\n'.join(lines).encode('utf-8', 'surrogateescape')).hexdigest()
+        
+        rules = [rule for rule in map(_gitignore_line_to_regex, lines) if rule is not None]
+        self.dir_regex, self.dir_negate = self._combine(rules)
+        self.file_regex, self.file_negate = self._combine([rule for rule in rules if not rule[2]])
+    
+    @classmethod
+    def from_file(cls, path, base=''):
+        """Carga un .gitignore; devuelve None si no existe o no se puede leer"""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        return cls(lines, base)
+    
+    @staticmethod
+    def _combine(rules):
+        """Une las reglas en una regex; cada alternativa termina en un grupo vacío que la identifica"""
+        if not rules:
+            return None, []
+        ordered = rules[::-1]
+        regex = re.compile('|'.join(f"(?:{rule_regex})()" for rule_regex, _, _ in ordered), re.DOTALL)
+        return regex, [negate for _, negate, _ in ordered]
+    
+    def match(self, rel_path, is_dir):
+        """
+        Evalúa una ruta relativa a la raíz del recorrido.
+        Devuelve True si se ignora, False si una regla '!' la vuelve a incluir
+        o None si ninguna regla de este archivo la menciona.
+        """
+        if self.base:
+            rel_path = rel_path[len(self.base) + 1:]
+        
+        if is_dir:
+            regex, negate = self.dir_regex, self.dir_negate
+        else:
+            regex, negate = self.file_regex, self.file_negate
+        if regex is None:
+            return None
+        
+        m = regex.fullmatch(rel_path)
+        if m is None:
+            return None
+        return not negate[m.lastindex - 1]
+
+def is_ignored(chain, rel_path, is_dir):
+    """Aplica una cadena de reglas (de la raíz al directorio actual); decide el .gitignore más profundo"""
+    for rules in reversed(chain):
+        result = rules.match(rel_path, is_dir)
+        if result is not None:
+            return result
+    return False
+
+def _chain_digest(chain):
+    """Resumen de una cadena de reglas, para validar entradas de la caché"""
+    return ','.join(rules.digest for rules in chain)
+
+class DirNode:
+    """
+    Nodo compacto de un directorio.
+    
+    dirs: subdirectorios por nombre
+    files: nombres de archivos visibles (internados) en orden de listado
+    is_img_dir: si el directorio contiene principalmente imágenes
+    patterns: patrones condensados ya calculados, o None si aún no se calcularon
+    sizes: tamaño en bytes de cada archivo, alineado con files (None si no se pidió)
+    lines: líneas de cada archivo de texto, alineado con files (None si es binario)
+    rollup: totales del subárbol (bytes, archivos, líneas), calculados por compute_rollups
+    summary: TreeSummary si el directorio superó los límites y solo se contó su contenido
+    
+    La agrupación por nombre base no se guarda: se calcula al renderizar.
+    """
+    __slots__ = ('dirs', 'files', 'is_img_dir', 'patterns', 'sizes', 'lines', 'rollup', 'summary')
+    
+    def __init__(self, files, is_img_dir, patterns=None, sizes=None):
+        self.dirs = {}
+        self.files = files
+        self.is_img_dir = is_img_dir
+        self.patterns = patterns
+        self.sizes = sizes
+        self.lines = None
+        self.rollup = None
+        self.summary = None
+
+def build_node(files, cached=None, sizes=None):
+    """
+    Crea el nodo de un directorio a partir de sus archivos.
+    Si se pasa una entrada de caché válida se reutiliza su clasificación;
+    sizes es el diccionario nombre -> bytes que rellena scan_directory.
+    """
+    # Excluir archivos ocultos y .DS_Store; los nombres repetidos entre
+    # directorios (index.js, README.md...) comparten una sola cadena
+    files = tuple([sys.intern(f) for f in files if not f.startswith('.') and f != '.DS_Store'])
+    
+    if sizes is not None:
+        sizes = tuple([sizes[f] for f in files])
+    
+    if cached is not None:
+        return DirNode(files, cached['is_img_dir'], cached['patterns'] if cached['condense'] else {}, sizes)
+    return DirNode(files, is_image_directory(files), sizes=sizes)
+
+class TreeSummary:
+    """Totales de un subárbol que se contó sin construir nodos (ver count_tree)"""
+    __slots__ = ('files', 'dirs', 'bytes')
+    
+    def __init__(self, files=0, dirs=0, total_bytes=0):
+        self.files = files
+        self.dirs = dirs
+        self.bytes = total_bytes
+    
+    def label(self):
+        return f"… {self.files:,} archivos, {self.dirs:,} directorios, {format_bytes(self.bytes)}"
+
+def count_tree(path, exclude_dirs):
+    """
+    Cuenta archivos, subdirectorios y bytes de un subárbol con os.scandir,
+    sin construir nodos ni guardar nombres. Usa los mismos filtros que el
+    recorrido normal (directorios excluidos, enlaces a directorios, archivos
+    ocultos), pero no aplica los .gitignore. Los directorios ilegibles se omiten.
+    """
+    summary = TreeSummary()
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir() and not entry.is_symlink()
+                except OSError:
+                    is_dir = False
+                
+                if is_dir:
+                    if entry.name not in exclude_dirs:
+                        summary.dirs += 1
+                        stack.append(entry.path)
+                elif not entry.name.startswith('.') and entry.name != '.DS_Store':
+                    summary.files += 1
+                    try:
+                        summary.bytes += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+    return summary
+
+def _summary_node(summary):
+    """Nodo sin contenido que solo muestra los totales del subárbol"""
+    node = DirNode((), False, {})
+    node.summary = summary
+    return node
+
+class ScanCache:
+    """
+    Caché en disco de listados de directorios, indexada por ruta y validada
+    con el mtime y el inodo del directorio.
+    
+    Guarda el listado junto con la clasificación ya calculada (is_img_dir,
+    should_condense y los patrones condensados), de modo que solo se vuelven
+    a leer y clasificar los directorios cuyo mtime cambió. Cada entrada
+    recuerda también el resumen de las reglas .gitignore con las que se
+    filtraron sus archivos, para invalidarla si esas reglas cambian.
+    """
+    VERSION = 3
+    
+    def __init__(self, condensation_threshold, entries=None):
+        self.condensation_threshold = condensation_threshold
+        self.entries = entries or {}
+        self.fresh = {}
+    
+    @classmethod
+    def load(cls, cache_file, condensation_threshold):
+        """Carga la caché; si no existe, está dañada o usa otro umbral, empieza vacía"""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(condensation_threshold)
+        
+        if data.get('version') != cls.VERSION or data.get('threshold') != condensation_threshold:
+            return cls(condensation_threshold)
+        return cls(condensation_threshold, data.get('dirs'))
+    
+    def save(self, cache_file):
+        """Guarda solo los directorios visitados en esta ejecución"""
+        data = {'version': self.VERSION, 'threshold': self.condensation_threshold, 'dirs': self.fresh}
+        tmp_file = f"{cache_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+    
+    def lookup(self, path, stat):
+        """Devuelve la entrada guardada si el directorio no cambió desde la última ejecución"""
+        entry = self.entries.get(path)
+        if entry is not None and entry['mtime_ns'] == stat.st_mtime_ns and entry['ino'] == stat.st_ino:
+            return entry
+        return None
+    
+    def store(self, path, stat, dirs, node, has_gitignore, rules_digest):
+        """Registra el listado y la clasificación de un directorio recién visitado"""
+        if node.patterns is None:
+            condense, node.patterns = classify_files(node.files, node.is_img_dir, self.condensation_threshold)
+        else:
+            condense = bool(node.patterns)
+        
+        self.fresh[path] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'ino': stat.st_ino,
+            'dirs': dirs,
+            'files': node.files,
+            'is_img_dir': node.is_img_dir,
+            'condense': condense,
+            'patterns': node.patterns,
+            'gitignore': has_gitignore,
+            'rules': rules_digest,
+        }
+
+def _read_directory(path, rel, chain, cache=None, gitignore=False, strict=False, with_sizes=False, profiler=None):
+    """
+    Lee un directorio para el recorrido (se ejecuta en los hilos del pool).
+    
+    Consulta la caché, carga el .gitignore del directorio si lo hay y quita
+    los archivos ignorados. Devuelve (dirs, files, stat, entrada de caché,
+    cadena de reglas, tiene .gitignore, tamaños) o None si no se puede leer;
+    con strict=True los errores de lectura se propagan. Los tamaños solo se
+    recogen con with_sizes=True, que no es compatible con la caché.
+    Con un Profiler se miden los listados y las consultas a la caché.
+    """
+    scan = scan_directory
+    if profiler is not None:
+        scan = profiler.wrap('scan_directory', scan_directory, after=profiler.count_scan)
+    
+    sizes = {} if with_sizes else None
+    try:
+        stat = entry = None
+        if cache is not None:
+            stat = os.stat(path)
+            lookup = cache.lookup
+            if profiler is not None:
+                lookup = profiler.wrap('ScanCache.lookup', lookup, after=profiler.count_lookup)
+            entry = lookup(path, stat)
+        if entry is not None:
+            dirs, files = entry['dirs'], entry['files']
+            has_gitignore = entry['gitignore']
+        else:
+            dirs, files = scan(path, sizes)
+            has_gitignore = '.gitignore' in files
+        
+        if gitignore and has_gitignore:
+            rules = GitIgnoreRules.from_file(os.path.join(path, '.gitignore'), rel)
+            if rules is not None:
+                chain = chain + (rules,)
+        
+        if entry is not None and entry['rules'] != _chain_digest(chain):
+            # Los archivos guardados se filtraron con otras reglas
+            entry = None
+            dirs, files = scan(path)
+    except OSError:
+        if strict:
+            raise
+        return None
+    
+    if chain and entry is None:
+        prefix = f"{rel}/" if rel else ''
+        files = [f for f in files if not is_ignored(chain, prefix + f, False)]
+    
+    return dirs, files, stat, entry, chain, has_gitignore, sizes
+
+def _read_within_budget(path, rel, chain, cache, gitignore, with_sizes, exclude_dirs, count_only=False,
+                        max_items=None, profiler=None):
+    """
+    Como _read_directory, pero respetando los límites del recorrido: con
+    count_only=True (más allá de max_depth) o si el directorio mostraría más
+    de max_items entradas, devuelve un TreeSummary en lugar del listado.
+    Con un Profiler, el tiempo de cada directorio se atribuye a su ruta relativa.
+    """
+    if count_only:
+        return _count_subtree(path, rel, exclude_dirs, profiler)
+    read = _read_directory
+    if profiler is not None:
+        read = profiler.wrap('_read_directory', _read_directory, 'listar', rel)
+    listing = read(path, rel, chain, cache, gitignore, False, with_sizes, profiler)
+    if listing is None or max_items is None:
+        return listing
+    
+    # Solo cuentan las entradas que se mostrarían: sin ocultos, excluidos ni ignorados
+    dirs, files, _, _, chain, _, sizes = listing
+    files = [f for f in files if not f.startswith('.') and f != '.DS_Store']
+    dirs = _child_dirs(dirs, rel, chain, exclude_dirs)
+    if len(files) + len(dirs) <= max_items:
+        return listing
+    return _summarize_listing(path, rel, files, dirs, sizes, exclude_dirs, profiler)
+
+def _count_subtree(path, rel, exclude_dirs, profiler=None):
+    """count_tree de un subdirectorio, medido si hay un Profiler"""
+    if profiler is None:
+        return count_tree(path, exclude_dirs)
+    return profiler.wrap('count_tree', count_tree, 'contar', rel, profiler.count_tree)(path, exclude_dirs)
+
+def _summarize_listing(path, rel, files, dirs, sizes, exclude_dirs, profiler=None):
+    """
+    Totales de un directorio que ya se listó: sus archivos se cuentan desde
+    el listado (con los tamaños recogidos, o un stat por archivo) y solo sus
+    subdirectorios se recorren con count_tree.
+    """
+    summary = TreeSummary(len(files), len(dirs))
+    for name in files:
+        if sizes is not None:
+            summary.bytes += sizes.get(name, 0)
+            continue
+        try:
+            summary.bytes += os.stat(os.path.join(path, name), follow_symlinks=False).st_size
+        except OSError:
+            pass
+    
+    prefix = f"{rel}/" if rel else ''
+    for name in dirs:
+        subtree = _count_subtree(os.path.join(path, name), prefix + name, exclude_dirs, profiler)
+        summary.files += subtree.files
+        summary.dirs += subtree.dirs
+        summary.bytes += subtree.bytes
+    return summary
+
+def _child_dirs(dirs, rel, chain, exclude_dirs):
+    """Subdirectorios que hay que recorrer: sin excluidos ni ignorados por .gitignore"""
+    if not chain:
+        return [d for d in dirs if d not in exclude_dirs]
+    prefix = f"{rel}/" if rel else ''
+    return [d for d in dirs if d not in exclude_dirs and not is_ignored(chain, prefix + d, True)]
+
+def _root_chain(start_path, gitignore):
+    """Reglas iniciales: .git/info/exclude, que tiene menos prioridad que cualquier .gitignore"""
+    if not gitignore:
+        return ()
+    rules = GitIgnoreRules.from_file(os.path.join(start_path, '.git', 'info', 'exclude'), '')
+    return (rules,) if rules is not None else ()
+
+def walk_directory_tree(start_path, exclude_dirs, max_workers=None, cache=None, gitignore=False, sizes=False,
+                        max_depth=None, max_items=None, profiler=None):
+    """
+    Recorre el árbol con os.scandir listando directorios en paralelo.
+    
+    Cada directorio pendiente se envía a un pool de hilos en cuanto se lista
+    su padre, de modo que los hermanos se leen a la vez. Cada tarea conserva
+    una referencia directa al nodo padre, así que no hace falta volver a
+    navegar desde la raíz. Con una ScanCache, los directorios sin cambios
+    se toman de la caché en lugar de listarse. Con gitignore=True se aplican
+    los .gitignore anidados y los subárboles ignorados nunca se listan.
+    Con sizes=True cada nodo guarda el tamaño de sus archivos.
+    
+    Solo se muestran max_depth niveles bajo la raíz (como tree -L): el
+    contenido de los directorios más profundos, o de los subdirectorios con
+    más de max_items entradas, no se lista; solo se cuenta y el directorio
+    se devuelve como un nodo con summary (ver count_tree). La raíz siempre
+    se lista completa.
+    Con un Profiler se mide el listado de cada directorio (ver Profiler).
+    Devuelve el nodo raíz.
+    """
+    results = queue.SimpleQueue()
+    
+    def visit(path, rel, listing, depth):
+        if isinstance(listing, TreeSummary):
+            return _summary_node(listing), 0
+        
+        dirs, files, stat, entry, chain, has_gitignore, file_sizes = listing
+        node = build_node(files, entry, file_sizes)
+        if cache is not None:
+            cache.store(path, stat, dirs, node, has_gitignore, _chain_digest(chain))
+        
+        children = _child_dirs(dirs, rel, chain, exclude_dirs)
+        for dir_name in children:
+            child_rel = f"{rel}/{dir_name}" if rel else dir_name
+            submit(os.path.join(path, dir_name), child_rel, chain, node, dir_name, depth + 1)
+        return node, len(children)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def submit(path, rel, chain, parent, name, depth):
+            count_only = max_depth is not None and depth >= max_depth
+            future = pool.submit(_read_within_budget, path, rel, chain, cache, gitignore, sizes, exclude_dirs,
+                                 count_only, max_items, profiler)
+            future.add_done_callback(lambda f: results.put((path, rel, parent, name, depth, f)))
+        
+        # El directorio raíz se lista directamente para propagar sus errores
+        read = _read_directory
+        if profiler is not None:
+            read = profiler.wrap('_read_directory', _read_directory, 'listar', '')
+        listing = read(start_path, '', _root_chain(start_path, gitignore), cache, gitignore, True, sizes, profiler)
+        root_node, pending = visit(start_path, '', listing, 0)
+        
+        while pending:
+            path, rel, parent, name, depth, future = results.get()
+            pending -= 1
+            
+            listing = future.result()
+            if listing is None:
+                # os.walk omite los directorios que no puede leer
+                continue
+            
+            node, children = visit(path, rel, listing, depth)
+            parent.dirs[sys.intern(name)] = node
+            pending += children
+    
+    return root_node
+
+def _find_git_dir(repo_path):
+    """Localiza el directorio .git, siguiendo el archivo 'gitdir:' de worktrees y submódulos"""
+    git_path = os.path.join(repo_path, '.git')
+    if os.path.isfile(git_path):
+        with open(git_path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        if content.startswith('gitdir:'):
+            return os.path.join(repo_path, content[len('gitdir:'):].strip())
+    return git_path
+
+def _git_hash_size(git_dir):
+    """Tamaño del hash de objetos: 20 bytes (SHA-1) o 32 si el repositorio usa SHA-256"""
+    try:
+        with open(os.path.join(git_dir, 'config'), 'r', encoding='utf-8') as f:
+            config = f.read()
+    except OSError:
+        return 20
+    return 32 if re.search(r'objectformat\s*=\s*sha256', config, re.IGNORECASE) else 20
+
+def _read_offset_varint(data, pos):
+    """Lee el entero de longitud variable que usa el índice v4 para comprimir rutas"""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, pos
+
+def read_git_index(repo_path='.'):
+    """
+    Lee las rutas versionadas directamente del archivo binario .git/index
+    (versiones 2, 3 y 4), sin ejecutar git.
+    
+    Devuelve las rutas relativas al repositorio con '/' como separador.
+    Los submódulos y los directorios de un índice disperso terminan en '/'.
+    """
+    git_dir = _find_git_dir(repo_path)
+    with open(os.path.join(git_dir, 'index'), 'rb') as f:
+        data = f.read()
+    
+    signature, version, count = struct.unpack_from('>4sII', data, 0)
+    if signature != b'DIRC' or version not in (2, 3, 4):
+        raise ValueError(f"Índice de git no soportado (versión {version})")
+    
+    hash_size = _git_hash_size(git_dir)
+    # ctime, mtime, dev, ino, mode, uid, gid y size ocupan 40 bytes antes del hash
+    flags_offset = 40 + hash_size
+    
+    paths = []
+    offset = 12
+    previous = b''
+    for _ in range(count):
+        mode = struct.unpack_from('>I', data, offset + 24)[0]
+        flags = struct.unpack_from('>H', data, offset + flags_offset)[0]
+        name_offset = offset + flags_offset + 2
+        if flags & 0x4000:
+            # Entrada con flags extendidos (v3+)
+            name_offset += 2
+        
+        if version == 4:
+            # La ruta se guarda como sufijo de la anterior
+            strip, name_offset = _read_offset_varint(data, name_offset)
+            end = data.index(b'\0', name_offset)
+            name = previous[:len(previous) - strip] + data[name_offset:end]
+            offset = end + 1
+        else:
+            end = data.index(b'\0', name_offset)
+            name = data[name_offset:end]
+            # Cada entrada se rellena con NULs hasta un múltiplo de 8 bytes
+            offset += (name_offset - offset + len(name) + 8) & ~7
+        
+        # Las entradas en conflicto repiten la ruta una vez por stage
+        if name == previous and paths:
+            continue
+        previous = name
+        
+        path = os.fsdecode(name)
+        if mode & 0o170000 in (0o160000, 0o040000):
+            path = path.rstrip('/') + '/'
+        paths.append(path)
+    
+    return paths
+
+def read_path_list(stream):
+    """
+    Lee una lista de rutas separadas por saltos de línea (por ejemplo, la salida
+    de `git ls-files` o `find`). Las rutas que terminan en '/' son directorios.
+    """
+    for line in stream:
+        path = line.rstrip('\r\n')
+        if os.sep != '/':
+            path = path.replace(os.sep, '/')
+        while path.startswith('./'):
+            path = path[2:]
+        if path and path != '.':
+            yield path
+
+def build_tree_from_paths(paths, exclude_dirs):
+    """
+    Construye el árbol de nodos a partir de una lista de rutas relativas,
+    sin recorrer el sistema de archivos. Aplica las mismas exclusiones de
+    directorios y el mismo filtrado de archivos ocultos que el recorrido normal.
+    """
+    # Archivos por directorio, en orden de aparición (los padres antes que los hijos)
+    listings = {'': []}
+    excluded = set()
+    
+    def ensure_dir(dir_path):
+        # Subir hasta el primer ancestro conocido ('' siempre lo es) y registrar
+        # los que faltan de arriba abajo, sin recursión
+        missing = []
+        while dir_path not in listings and dir_path not in excluded:
+            missing.append(dir_path)
+            dir_path = dir_path.rpartition('/')[0]
+        visible = dir_path in listings
+        for dir_path in reversed(missing):
+            if visible and dir_path.rpartition('/')[2] not in exclude_dirs:
+                listings[dir_path] = []
+            else:
+                visible = False
+                excluded.add(dir_path)
+        return visible
+    
+    for path in paths:
+        is_dir = path.endswith('/')
+        path = path.strip('/')
+        if not path:
+            continue
+        
+        if is_dir:
+            ensure_dir(path)
+            continue
+        
+        parent, _, name = path.rpartition('/')
+        if ensure_dir(parent):
+            listings[parent].append(name)
+    
+    nodes = {}
+    for dir_path, files in listings.items():
+        node = build_node(files)
+        nodes[dir_path] = node
+        if dir_path:
+            parent, _, name = dir_path.rpartition('/')
+            nodes[parent].dirs[sys.intern(name)] = node
+    
+    return nodes['']
+
+class Profiler:
+    """
+    Perfilador de --profile.
+    
+    generate_directory_tree lo pasa explícitamente por la cadena de llamadas
+    (recorrido, listados, clasificación y renderizado), igual que la caché o
+    el anotador; cada función envuelve con wrap() lo que quiere medir y, sin
+    --profile, recibe None y no paga nada. Registra el tiempo de pared y de
+    CPU de cada llamada, atribuye el de listar, contar y clasificar a la ruta
+    relativa de cada directorio, cuenta listados y stats, y mide las fases
+    marcadas con phase(). Todo se exporta como eventos de traza de Chrome
+    (chrome://tracing, Perfetto).
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.phases = []
+        self.functions = defaultdict(lambda: [0, 0.0, 0.0])
+        self.directories = defaultdict(lambda: defaultdict(float))
+        self.counters = Counter()
+    
+    def wrap(self, name, func, category=None, rel=None, after=None):
+        """
+        Devuelve func medida: sus llamadas y tiempos se suman a name y, con
+        category, se atribuyen también al directorio rel. after(args, resultado)
+        actualiza los contadores.
+        """
+        directory = rel or '.'
+        
+        def wrapper(*args):
+            start = time.perf_counter()
+            cpu_start = time.thread_time()
+            result = func(*args)
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - cpu_start
+            with self.lock:
+                totals = self.functions[name]
+                totals[0] += 1
+                totals[1] += wall
+                totals[2] += cpu
+                if after is not None:
+                    after(args, result)
+                if category is not None:
+                    self.directories[directory][category] += wall
+                    self.events.append((category, directory, start, wall, cpu, threading.get_ident()))
+            return result
+        return wrapper
+    
+    def count_scan(self, args, result):
+        self.counters['listados'] += 1
+        sizes = args[1] if len(args) > 1 else None
+        if sizes:
+            self.counters['stats'] += len(sizes)
+    
+    def count_tree(self, args, summary):
+        self.counters['listados'] += summary.dirs + 1
+        self.counters['stats'] += summary.files
+    
+    def count_lookup(self, args, result):
+        # ScanCache.lookup recibe el os.stat del directorio
+        self.counters['stats'] += 1
+    
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            self.phases.append((name, wall, cpu))
+            self.events.append(('fase', name, start, wall, cpu, threading.get_ident()))
+    
+    def slowest_directories(self, top=10):
+        """Directorios con más tiempo de pared sumando listado, conteo y clasificación"""
+        ranked = sorted(self.directories.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return ranked[:top]
+    
+    def report(self, top=10):
+        """Muestra las fases, los contadores y los directorios más lentos"""
+        print("Perfil de la ejecución:")
+        for name, wall, cpu in self.phases:
+            print(f"  fase {name}: {wall * 1000:.1f} ms de pared, {cpu * 1000:.1f} ms de CPU")
+        print(f"  {self.counters['listados']} listados de directorios, {self.counters['stats']} stats, "
+              f"{format_bytes(self.counters['bytes escritos'])} escritos")
+        for name, (calls, wall, cpu) in sorted(self.functions.items(), key=lambda item: -item[1][1]):
+            print(f"  {name}: {calls} llamadas, {wall * 1000:.1f} ms de pared, {cpu * 1000:.1f} ms de CPU")
+        print("  Directorios más lentos:")
+        for name, categories in self.slowest_directories(top):
+            detail = ', '.join(f"{category} {wall * 1000:.1f} ms" for category, wall in sorted(categories.items()))
+            print(f"    {sum(categories.values()) * 1000:8.2f} ms  {name} ({detail})")
+    
+    def write_trace(self, trace_file):
+        """Exporta los eventos en el formato JSON de trazas de Chrome (tiempos en microsegundos)"""
+        events = []
+        for category, name, start, wall, cpu, thread in self.events:
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread,
+                           'ts': round((start - self.origin) * 1e6, 3), 'dur': round(wall * 1e6, 3),
+                           'args': {'cpu_ms': round(cpu * 1000, 3)}})
+        data = {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': dict(self.counters)}
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+def generate_directory_tree(start_path='.', output_file='directory_structure.txt', exclude_dirs=None, notes=None, condensation_threshold=10, max_workers=None, streaming=False, cache_file=None, paths=None, gitignore=False, index_dir=None,
+                            imports_file=None, imports_cache=None, sizes=False, max_depth=None, max_items=None,
+                            duplicates_file=None, mark_duplicates=False, snapshot_file=None, compare_file=None,
+                            lint_report=None, bundle_stats=None, profile_file=None, assets_file=None):
+    """
+    Genera un archivo de texto con la estructura de directorios mejorada y condensada
+    
+    Args:
+        start_path: Directorio inicial para comenzar la exploración
+        output_file: Nombre del archivo donde se guardará la estructura
+        exclude_dirs: Lista de directorios a excluir
+        notes: Diccionario con patrones de archivos y notas a añadir
+        condensation_threshold: Número mínimo de archivos para considerar condensación
+        max_workers: Número de hilos para listar directorios (None = valor por defecto)
+        streaming: Si es True, escribe cada subárbol mientras se recorre sin construir el árbol en memoria
+        cache_file: Archivo de caché para re-escaneos incrementales (None = sin caché)
+        paths: Rutas relativas a start_path (por ejemplo de read_git_index); si se indican,
+            el árbol se construye a partir de ellas en lugar de recorrer el disco
+        gitignore: Si es True, respeta los .gitignore anidados y .git/info/exclude al recorrer
+        index_dir: Si se indica, escribe ahí también los inventarios del proyecto
+            (all_files.txt, imported_css.txt...) a partir del mismo recorrido
+        imports_file: Si se indica, guarda ahí en JSON el grafo de imports de los módulos JS/TS
+        imports_cache: Caché por hash de contenido para no volver a analizar módulos sin cambios
+        sizes: Si es True, anota cada directorio y archivo con su tamaño, número de archivos y líneas
+        max_depth: Niveles que se muestran bajo la raíz; más abajo solo se cuentan archivos y bytes
+        max_items: Entradas máximas por directorio; los que tengan más se resumen en una línea
+        duplicates_file: Si se indica, guarda ahí en JSON los grupos de archivos con el mismo contenido
+        mark_duplicates: Si es True, marca en el árbol los archivos duplicados con el número de su grupo
+        snapshot_file: Si se indica, guarda ahí una instantánea del árbol (ver snapshot_tree)
+        compare_file: Instantánea anterior con la que comparar el árbol; se muestran los cambios
+        lint_report: Informe JSON de ESLint; cada línea muestra los errores y avisos de lint que le corresponden
+        bundle_stats: stats.html del visualizador de Vite/Rollup; cada línea muestra los bytes que aporta al bundle
+        profile_file: Si se indica, perfila la ejecución (ver Profiler) y guarda ahí la traza en formato Chrome
+        assets_file: Si se indica, lee la cabecera de las imágenes de public/ y src/assets, guarda ahí
+            el inventario por carpeta y anota el árbol con formato, dimensiones y peso
+    
+    Returns:
+        La lista de cambios de diff_snapshots si se indicó compare_file; si no, None
+    """
+    if streaming and (cache_file or index_dir or imports_file or snapshot_file or compare_file or lint_report
+                      or bundle_stats or assets_file):
+        raise ValueError("El modo streaming no admite caché de escaneo, inventarios, grafo de imports, "
+                         "instantáneas, informes de lint o del bundle ni inventario de imágenes")
+    if paths is not None and (streaming or cache_file):
+        raise ValueError("Una lista de rutas no se puede combinar con streaming ni con caché")
+    find_dups = duplicates_file is not None or mark_duplicates
+    if (sizes or find_dups) and (streaming or cache_file or paths is not None):
+        raise ValueError("Los tamaños y los duplicados necesitan un recorrido completo del disco, sin streaming ni caché")
+    if paths is not None and (max_depth is not None or max_items is not None):
+        raise ValueError("Los límites de profundidad y de entradas solo se aplican al recorrer el disco")
+    if (max_depth is not None or max_items is not None) and (index_dir or imports_file or find_dups or assets_file
+                                                             or lint_report or bundle_stats):
+        # Se calculan sobre los archivos del árbol, que con límites está resumido
+        raise ValueError("Los límites de profundidad y de entradas no se pueden combinar con inventarios, grafo "
+                         "de imports, duplicados, informes de lint o del bundle ni inventario de imágenes")
+    
+    if exclude_dirs is None:
+        exclude_dirs = list(DEFAULT_EXCLUDE_DIRS)
+    
+    if notes is None:
+        notes = {}
+    
+    # Compilar las notas una sola vez para todo el árbol
+    if not isinstance(notes, NoteMatcher):
+        notes = NoteMatcher(notes)
+    
+    # Obtener el nombre del directorio raíz
+    root_name = os.path.basename(os.path.abspath(start_path))
+    changes = None
+    
+    # La instantánea anterior se lee antes de recorrer, para fallar pronto si no es comparable
+    previous = load_snapshot(compare_file, condensation_threshold) if compare_file is not None else None
+    
+    profiler = Profiler() if profile_file is not None else None
+    
+    def phase(name):
+        return profiler.phase(name) if profiler is not None else contextlib.nullcontext()
+    
+    if streaming:
+        with phase('streaming'), open(output_file, 'w', encoding='utf-8') as f:
+            f.write(f"{root_name}/\n")
+            write_lines(f, iter_tree_lines_streaming(start_path, exclude_dirs, notes, condensation_threshold,
+                                                     max_workers, gitignore, max_depth, max_items, profiler))
+    else:
+        with phase('recorrido'):
+            if paths is not None:
+                root_node = build_tree_from_paths(paths, exclude_dirs)
+            else:
+                root_node = _walk_with_cache(start_path, exclude_dirs, max_workers, cache_file, condensation_threshold,
+                                             gitignore, sizes or find_dups, max_depth, max_items, profiler)
+        
+        annotator = None
+        if sizes:
+            with phase('tamaños'):
+                compute_rollups(root_node, start_path, max_workers=max_workers)
+            annotator = SizeAnnotator()
+        
+        duplicates = None
+        if find_dups:
+            with phase('duplicados'):
+                duplicates = find_duplicates(root_node, start_path, max_workers)
+            if mark_duplicates:
+                annotator = DuplicateAnnotator(duplicates, annotator)
+        
+        if lint_report is not None:
+            with phase('lint'):
+                lint_summary = read_lint_report(lint_report, root_node)
+            print_lint_summary(lint_summary, lint_report)
+            annotator = LintAnnotator(lint_summary, root_node, annotator)
+        
+        if bundle_stats is not None:
+            with phase('bundle'):
+                bundle = BundleSizes(read_visualizer_stats(bundle_stats), iter_tree_files(root_node))
+            print_bundle_summary(bundle, bundle_stats)
+            annotator = BundleAnnotator(bundle, root_node, annotator)
+        
+        if assets_file is not None:
+            with phase('imágenes'):
+                inventory = AssetInventory(root_node, start_path, max_workers=max_workers)
+            write_asset_report(inventory, assets_file)
+            annotator = AssetAnnotator(inventory, annotator)
+        
+        # Escribir el árbol a un archivo
+        with phase('escritura'), open(output_file, 'w', encoding='utf-8') as f:
+            f.write(f"{root_name}/{annotator.dir_label(root_node) if annotator else ''}\n")
+            write_tree(f, root_node, '', notes, condensation_threshold, annotator, profiler)
+        
+        if duplicates_file is not None:
+            write_duplicate_report(duplicates, duplicates_file)
+        
+        if snapshot_file is not None or compare_file is not None:
+            with phase('instantánea'):
+                snapshot = build_snapshot(root_node, condensation_threshold)
+                if snapshot_file is not None:
+                    write_snapshot(snapshot, snapshot_file)
+                if compare_file is not None:
+                    changes = diff_snapshots(previous, snapshot)
+        
+        if index_dir is not None:
+            with phase('inventarios'):
+                write_project_index(root_node, start_path, index_dir)
+        
+        if imports_file is not None:
+            with phase('imports'):
+                write_import_graph(root_node, start_path, imports_file, imports_cache)
+    
+    print(f"Estructura de directorios guardada en '{output_file}'")
+    
+    if changes is not None:
+        print(f"{len(changes)} cambios respecto a '{compare_file}'")
+        for line in format_snapshot_diff(changes):
+            print(f"  {line}")
+    
+    if profiler is not None:
+        written = [output_file, duplicates_file, snapshot_file, imports_file, assets_file]
+        profiler.counters['bytes escritos'] = sum(os.path.getsize(f) for f in written if f and os.path.exists(f))
+        profiler.report()
+        profiler.write_trace(profile_file)
+        print(f"Traza guardada en '{profile_file}'")
+    return changes
+
+def _walk_with_cache(start_path, exclude_dirs, max_workers, cache_file, condensation_threshold, gitignore=False,
+                     sizes=False, max_depth=None, max_items=None, profiler=None):
+    """Recorre el disco, usando y actualizando la caché de escaneo si se indicó"""
+    cache = None
+    walk_path = start_path
+    if cache_file:
+        # Las entradas se indexan por ruta absoluta para no depender del cwd
+        cache = ScanCache.load(cache_file, condensation_threshold)
+        walk_path = os.path.abspath(start_path)
+    
+    # Recopilar la estructura de directorios
+    root_node = walk_directory_tree(walk_path, exclude_dirs, max_workers, cache, gitignore, sizes, max_depth, max_items,
+                                    profiler)
+    
+    if cache is not None:
+        cache.save(cache_file)
+    
+    return root_node
+
+def _count_nodes(root_node):
+    """Archivos y directorios visibles de un árbol de nodos (los resumidos cuentan su total)"""
+    files = dirs = 0
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        if node.summary is not None:
+            files += node.summary.files
+            dirs += node.summary.dirs
+        files += len(node.files)
+        dirs += len(node.dirs)
+        stack.extend(node.dirs.values())
+    return files, dirs
+
+def load_roots_config(config_file, exclude_dirs=None, notes=None, condensation_threshold=10, gitignore=False,
+                      max_depth=None, max_items=None):
+    """
+    Lee el archivo de configuración del modo multi-raíz (JSON):
+    
+        {
+          "exclude": ["node_modules", "dist"],
+          "notes": {"App\\\\.jsx$": "✅ Componente principal"},
+          "threshold": 8,
+          "gitignore": true,
+          "cache": ".estructura_cache.json",
+          "index": "estructura_index.txt",
+          "roots": [
+            {"path": ".", "output": "estructura_frontend.txt"},
+            {"path": "../plubot-backend", "threshold": 10, "max_depth": 6,
+             "notes": {"integrations\\\\.py$": "✅ NUEVO"}}
+          ]
+        }
+    
+    Los valores de primer nivel son los de todas las raíces y cada raíz puede
+    sustituirlos (exclude, threshold, gitignore, max_depth, max_items) o añadir
+    notas propias; los argumentos son los valores si el archivo no los indica.
+    Las rutas relativas se toman respecto al archivo de configuración. Sin
+    "output", cada raíz escribe estructura_<ruta>.txt con su ruta relativa a la
+    configuración ('fe/src' -> estructura_fe_src.txt); dos raíces con la misma
+    salida son un error.
+    Devuelve (lista de raíces, archivo de caché, archivo de índice, umbral general).
+    """
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(config_file))
+    
+    def resolve(path):
+        return os.path.join(base_dir, path) if path else None
+    
+    if not config.get('roots'):
+        raise ValueError(f"'{config_file}' no define ninguna raíz en 'roots'")
+    
+    if exclude_dirs is None:
+        exclude_dirs = list(DEFAULT_EXCLUDE_DIRS)
+    
+    defaults = {
+        'exclude': config.get('exclude', exclude_dirs),
+        'threshold': config.get('threshold', condensation_threshold),
+        'gitignore': config.get('gitignore', gitignore),
+        'max_depth': config.get('max_depth', max_depth),
+        'max_items': config.get('max_items', max_items),
+    }
+    general_notes = dict(notes or {}, **config.get('notes', {}))
+    
+    roots = []
+    outputs = {}
+    for entry in config['roots']:
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        root = {key: entry.get(key, value) for key, value in defaults.items()}
+        root['path'] = resolve(entry['path'])
+        root['name'] = os.path.basename(os.path.abspath(root['path']))
+        root['output'] = os.path.abspath(resolve(entry.get('output') or _default_root_output(root['path'], base_dir)))
+        root['notes'] = dict(general_notes, **entry.get('notes', {}))
+        
+        if root['output'] in outputs:
+            raise ValueError(f"Las raíces '{outputs[root['output']]}' y '{entry['path']}' escriben en la misma "
+                             f"salida '{root['output']}'; indica \"output\" en una de ellas")
+        outputs[root['output']] = entry['path']
+        roots.append(root)
+    
+    return (roots, resolve(config.get('cache')), resolve(config.get('index', 'estructura_index.txt')),
+            defaults['threshold'])
+
+def _default_root_output(path, base_dir):
+    """Nombre de salida por defecto de una raíz, a partir de su ruta relativa a la configuración"""
+    rel = os.path.relpath(os.path.abspath(path), base_dir)
+    parts = [part for part in rel.split(os.sep) if part not in ('.', '..')]
+    if not parts:
+        parts = [os.path.basename(os.path.abspath(path)) or 'raiz']
+    return f"estructura_{'_'.join(parts)}.txt"
+
+def _group_roots(roots):
+    """
+    Agrupa las raíces cuyas rutas reales se solapan (una contiene a la otra,
+    directamente o a través de un enlace simbólico). Cada grupo se recorre en
+    un mismo proceso, de la raíz más externa a la más interna.
+    """
+    groups = []
+    for root in sorted(roots, key=lambda r: len(r['real_path'])):
+        for group in groups:
+            outer = group[0]['real_path']
+            if root['real_path'] == outer or root['real_path'].startswith(outer.rstrip(os.sep) + os.sep):
+                group.append(root)
+                break
+        else:
+            groups.append([root])
+    return groups
+
+def _scan_root_group(group, cache_entries, cache_threshold, max_workers):
+    """
+    Recorre y escribe un grupo de raíces solapadas (se ejecuta en un proceso del pool).
+    
+    Todas comparten una ScanCache por umbral indexada por ruta real: lo que
+    lista la primera raíz ya no se vuelve a listar en las siguientes, solo se
+    comprueba su mtime. Las raíces con la misma ruta real y la misma
+    configuración reutilizan directamente el árbol ya construido.
+    Devuelve [(nombre, archivos, directorios, segundos)] y las entradas
+    nuevas de la caché persistente.
+    """
+    caches = {cache_threshold: ScanCache(cache_threshold, cache_entries)}
+    trees = {}
+    results = []
+    for root in group:
+        started = time.perf_counter()
+        threshold = root['threshold']
+        cache = caches.setdefault(threshold, ScanCache(threshold))
+        exclude_dirs = root['exclude']
+        
+        key = (root['real_path'], tuple(exclude_dirs), threshold, root['gitignore'], root['max_depth'],
+               root['max_items'])
+        root_node = trees.get(key)
+        if root_node is None:
+            root_node = walk_directory_tree(root['real_path'], exclude_dirs, max_workers, cache, root['gitignore'],
+                                            max_depth=root['max_depth'], max_items=root['max_items'])
+            trees[key] = root_node
+            # Lo recién listado queda disponible para las raíces siguientes del grupo
+            cache.entries.update(cache.fresh)
+        
+        with open(root['output'], 'w', encoding='utf-8') as f:
+            f.write(f"{root['name']}/\n")
+            write_tree(f, root_node, '', NoteMatcher(root['notes']), threshold)
+        
+        results.append((root['name'], *_count_nodes(root_node), time.perf_counter() - started))
+    
+    return results, caches[cache_threshold].fresh
+
+def write_roots_index(roots, results, index_file, elapsed):
+    """
+    Escribe el índice combinado: una línea por raíz con su salida y sus totales.
+    results[i] son los (archivos, directorios, segundos) de roots[i].
+    """
+    lines = [f"Índice de estructuras ({len(roots)} raíces, {elapsed:.2f} s)", '']
+    for root, (files, dirs, seconds) in zip(roots, results):
+        output = os.path.relpath(root['output'], os.path.dirname(os.path.abspath(index_file)))
+        shared = f"  (comparte directorios con {', '.join(root['shared'])})" if root['shared'] else ''
+        lines.append(f"{root['name']}/  →  {output}  ({files:,} archivos, {dirs:,} directorios, "
+                     f"{seconds:.2f} s){shared}")
+        lines.append(f"    {root['real_path']}")
+    
+    with open(index_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def generate_from_config(config_file, exclude_dirs=None, notes=None, condensation_threshold=10, gitignore=False,
+                         max_depth=None, max_items=None, max_workers=None, processes=None):
+    """
+    Modo multi-raíz: genera la estructura de todas las raíces de un archivo
+    de configuración (ver load_roots_config) y un índice combinado.
+    
+    Las raíces se agrupan por ruta real (ver _group_roots) y cada grupo se
+    recorre en un proceso distinto, así que el tiempo total se acerca al de
+    la raíz más lenta en lugar de a la suma. Dentro de un grupo los
+    directorios compartidos se listan una sola vez. Si la configuración
+    indica una caché, se carga una vez, cada grupo recibe solo las entradas
+    bajo sus rutas y al terminar se guardan juntas; solo cubre las raíces
+    que usan el umbral general.
+    
+    Args:
+        config_file: Archivo JSON con las raíces y su configuración
+        exclude_dirs, notes, condensation_threshold, gitignore, max_depth, max_items: Valores por
+            defecto si la configuración no los indica
+        max_workers: Hilos para listar directorios dentro de cada proceso
+        processes: Procesos del pool (None = uno por grupo, hasta el número de CPUs)
+    """
+    started = time.perf_counter()
+    roots, cache_file, index_file, threshold = load_roots_config(config_file, exclude_dirs, notes,
+                                                                 condensation_threshold, gitignore, max_depth,
+                                                                 max_items)
+    for root in roots:
+        root['real_path'] = os.path.realpath(root['path'])
+        if not os.path.isdir(root['real_path']):
+            raise ValueError(f"La raíz '{root['path']}' no es un directorio")
+    
+    for index, root in enumerate(roots):
+        root['index'] = index
+    groups = _group_roots(roots)
+    for group in groups:
+        for root in group:
+            root['shared'] = [os.path.basename(other['output']) for other in group if other is not root]
+    
+    cache = ScanCache.load(cache_file, threshold) if cache_file else ScanCache(threshold)
+    
+    def entries_under(real_path):
+        prefix = real_path.rstrip(os.sep) + os.sep
+        return {path: entry for path, entry in cache.entries.items()
+                if path == real_path or path.startswith(prefix)}
+    
+    results = [None] * len(roots)
+    if processes is None:
+        processes = min(len(groups), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_scan_root_group, group, entries_under(group[0]['real_path']), threshold, max_workers)
+                   for group in groups]
+        for group, future in zip(groups, futures):
+            group_results, fresh = future.result()
+            cache.fresh.update(fresh)
+            for root, (name, files, dirs, seconds) in zip(group, group_results):
+                results[root['index']] = (files, dirs, seconds)
+                print(f"Estructura de '{name}' guardada en '{root['output']}' ({seconds:.2f} s)")
+    
+    if cache_file:
+        cache.save(cache_file)
+    
+    elapsed = time.perf_counter() - started
+    write_roots_index(roots, results, index_file, elapsed)
+    print(f"Índice de {len(roots)} raíces guardado en '{index_file}' ({elapsed:.2f} s en total)")
+
+# Directorio de código fuente y extensiones que cubren los inventarios
+INDEX_SOURCE_DIR = 'src'
+INDEX_EXTENSIONS = {'.js', '.jsx', '.css'}
+
+_IMPORT_RE = re.compile(r'^\s*import\b', re.MULTILINE)
+_CSS_IMPORT_LINE_RE = re.compile(r'[^\n]*import[^\n]*\.css[^\n]*')
+_EXPORT_DEFAULT_RE = re.compile(r'\bexport\s+default\b')
+
+def iter_tree_files(node, rel=''):
+    """Genera las rutas relativas de todos los archivos visibles de un árbol de nodos"""
+    stack = [(node, rel)]
+    while stack:
+        current, current_rel = stack.pop()
+        prefix = f"{current_rel}/" if current_rel else ''
+        for name in current.files:
+            yield prefix + name
+        for name, child in current.dirs.items():
+            stack.append((child, prefix + name))
+
+def scan_source_file(path):
+    """
+    Lee un archivo fuente una sola vez y extrae lo que necesitan los inventarios.
+    Devuelve (tiene imports, líneas que importan CSS, tiene export default).
+    Se ejecuta en un proceso del pool.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return False, [], False
+    
+    css_imports = [line.rstrip('\r') for line in _CSS_IMPORT_LINE_RE.findall(text)]
+    return bool(_IMPORT_RE.search(text)), css_imports, bool(_EXPORT_DEFAULT_RE.search(text))
+
+def build_project_index(root_node, start_path, max_workers=None):
+    """
+    Construye los inventarios del proyecto a partir del árbol ya recorrido.
+    
+    Los archivos de INDEX_SOURCE_DIR se toman del árbol (sin volver a recorrer
+    el disco) y su contenido se analiza en paralelo con un pool de procesos,
+    leyendo cada archivo una sola vez. Devuelve un diccionario
+    nombre de inventario -> líneas.
+    """
+    source_node = root_node.dirs.get(INDEX_SOURCE_DIR)
+    sources = []
+    if source_node is not None:
+        sources = sorted(path for path in iter_tree_files(source_node, INDEX_SOURCE_DIR)
+                         if get_extension(path) in INDEX_EXTENSIONS)
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        scans = list(pool.map(scan_source_file, [os.path.join(start_path, path) for path in sources],
+                              chunksize=32))
+    
+    inventories = {
+        'all_files.txt': sources,
+        'all_css_files.txt': [],
+        'all_jsx_files.txt': [],
+        'importing_files.txt': [],
+        'imported_css.txt': set(),
+        'exported_components.txt': [],
+    }
+    for path, (has_imports, css_imports, has_default_export) in zip(sources, scans):
+        extension = get_extension(path)
+        if extension == '.css':
+            inventories['all_css_files.txt'].append(path)
+        else:
+            if extension == '.jsx':
+                inventories['all_jsx_files.txt'].append(path)
+                if has_default_export:
+                    inventories['exported_components.txt'].append(path)
+            if has_imports:
+                inventories['importing_files.txt'].append(path)
+        inventories['imported_css.txt'].update(css_imports)
+    
+    inventories['imported_css.txt'] = sorted(inventories['imported_css.txt'])
+    return inventories
+
+def write_project_index(root_node, start_path, index_dir='.', max_workers=None):
+    """Escribe cada inventario en su archivo dentro de index_dir"""
+    inventories = build_project_index(root_node, start_path, max_workers)
+    for name, lines in inventories.items():
+        with open(os.path.join(index_dir, name), 'w', encoding='utf-8') as f:
+            f.writelines(f"{line}\n" for line in lines)
+    print(f"Inventarios guardados en '{index_dir}' ({', '.join(inventories)})")
+
+# Módulos que analiza el grafo de imports y extensiones que se prueban al resolver
+IMPORT_GRAPH_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx')
+RESOLVE_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs', '.json')
+
+# Comentarios fuera de cadenas; las cadenas se capturan para conservarlas
+_JS_COMMENT_RE = re.compile(
+    r"""("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)|//[^\n]*|/\*.*?\*/""",
+    re.DOTALL)
+_STATIC_IMPORT_RE = re.compile(
+    r"""(?:^|[;}\s])(?:import|export)\s+(?:type\s+)?(?:[\w$*{}\s,]+?\s+from\s+)?['"]([^'"\n]+)['"]""")
+_DYNAMIC_IMPORT_RE = re.compile(r"""\b(?:import|require)\s*\(\s*['"]([^'"\n]+)['"]\s*\)""")
+_VITE_ALIAS_RE = re.compile(r"""['"]?(@[\w-]*)['"]?\s*:\s*path\.resolve\(\s*__dirname\s*,\s*['"]([^'"]+)['"]\s*\)""")
+_ENTRY_SCRIPT_RE = re.compile(r"""<script[^>]*\bsrc=["']/?([^"']+)["']""")
+
+def parse_imports(path):
+    """
+    Extrae los especificadores de import, export ... from, import() y require()
+    de un archivo JS/TS, ignorando los comentarios. Se ejecuta en un proceso del pool.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return []
+    
+    code = _JS_COMMENT_RE.sub(lambda m: m.group(1) or '', text)
+    specifiers = _STATIC_IMPORT_RE.findall(code) + _DYNAMIC_IMPORT_RE.findall(code)
+    return list(dict.fromkeys(specifiers))
+
+def _load_json_with_comments(path):
+    """Lee un jsconfig/tsconfig, que admiten comentarios y comas finales"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    text = _JS_COMMENT_RE.sub(lambda m: m.group(1) or '', text)
+    return json.loads(re.sub(r',(\s*[}\]])', r'\1', text))
+
+def load_import_aliases(start_path='.'):
+    """
+    Lee los alias de vite.aliases.js y de los paths de jsconfig.json/tsconfig.json.
+    Devuelve una lista de (prefijo, directorio relativo a start_path), del prefijo
+    más largo al más corto. Un alias de Vite como '@core' cubre '@core' y '@core/...'.
+    """
+    aliases = {}
+    
+    for config_name in ('jsconfig.json', 'tsconfig.json'):
+        try:
+            options = _load_json_with_comments(os.path.join(start_path, config_name)).get('compilerOptions', {})
+        except (OSError, ValueError):
+            continue
+        base_url = options.get('baseUrl', '.')
+        for key, targets in options.get('paths', {}).items():
+            if not targets:
+                continue
+            prefix = key[:-1] if key.endswith('*') else key
+            target = targets[0][:-1] if targets[0].endswith('*') else targets[0]
+            aliases.setdefault(prefix, posixpath.normpath(posixpath.join(base_url, target)))
+    
+    try:
+        with open(os.path.join(start_path, 'vite.aliases.js'), 'r', encoding='utf-8') as f:
+            for name, target in _VITE_ALIAS_RE.findall(f.read()):
+                target = posixpath.normpath(target)
+                aliases[f"{name}/"] = target
+                aliases[name] = target
+    except OSError:
+        pass
+    
+    return sorted(aliases.items(), key=lambda item: len(item[0]), reverse=True)
+
+def _resolve_module(candidate, known_files):
+    """Busca la ruta como archivo, con extensiones implícitas o como index de un directorio"""
+    if candidate in known_files:
+        return candidate
+    for extension in RESOLVE_EXTENSIONS:
+        if candidate + extension in known_files:
+            return candidate + extension
+    for extension in RESOLVE_EXTENSIONS:
+        index = f"{candidate}/index{extension}"
+        if index in known_files:
+            return index
+    return None
+
+def resolve_import(specifier, importer, aliases, known_files):
+    """
+    Resuelve un especificador a una ruta del proyecto.
+    Devuelve (ruta, None), (None, paquete externo) o (None, None) si no se encuentra.
+    """
+    specifier = specifier.split('?', 1)[0].split('#', 1)[0]
+    
+    if specifier.startswith('.'):
+        candidate = posixpath.join(posixpath.dirname(importer), specifier)
+    elif specifier.startswith('/'):
+        candidate = specifier[1:]
+    else:
+        for prefix, target in aliases:
+            if specifier == prefix or (prefix.endswith('/') and specifier.startswith(prefix)):
+                candidate = posixpath.join(target, specifier[len(prefix):])
+                break
+        else:
+            # Paquete de node_modules: se guarda solo el nombre ('@scope/pkg' o 'pkg')
+            parts = specifier.split('/')
+            return None, '/'.join(parts[:2]) if specifier.startswith('@') else parts[0]
+    
+    return _resolve_module(posixpath.normpath(candidate), known_files), None
+
+def find_entry_points(start_path, known_files):
+    """Módulos cargados directamente desde index.html con <script src>"""
+    try:
+        with open(os.path.join(start_path, 'index.html'), 'r', encoding='utf-8') as f:
+            html = f.read()
+    except OSError:
+        return []
+    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
+    return [src for src in _ENTRY_SCRIPT_RE.findall(html) if src in known_files]
+
+def _hash_file(path):
+    """SHA-1 del contenido de un archivo, o None si no se puede leer"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def _longest_chains(graph):
+    """Longitud de la cadena de imports más larga que parte de cada módulo (ignorando ciclos)"""
+    depth = {}
+    for start in graph:
+        if start in depth:
+            continue
+        # DFS iterativo: (módulo, iterador de sus imports)
+        on_stack = {start}
+        stack = [(start, iter(graph[start]))]
+        while stack:
+            module, children = stack[-1]
+            for child in children:
+                if child not in depth and child not in on_stack and child in graph:
+                    on_stack.add(child)
+                    stack.append((child, iter(graph[child])))
+                    break
+            else:
+                stack.pop()
+                on_stack.discard(module)
+                depth[module] = 1 + max((depth.get(child, 0) for child in graph[module] if child not in on_stack),
+                                        default=0)
+    return depth
+
+def build_import_graph(root_node, start_path, cache_file=None, max_workers=None):
+    """
+    Construye el grafo de dependencias de los módulos JS/TS de INDEX_SOURCE_DIR.
+    
+    La lista de módulos sale del árbol ya recorrido. Cada archivo se identifica
+    por el hash de su contenido: solo los que no están en la caché se analizan,
+    en un pool de procesos. Los especificadores se resuelven con los alias de
+    Vite y jsconfig. Devuelve un diccionario listo para volcar a JSON con el
+    grafo, los módulos huérfanos (nadie los importa), los que no se alcanzan
+    desde los puntos de entrada y la cadena de imports más larga de cada módulo.
+    """
+    known_files = set(iter_tree_files(root_node))
+    modules = sorted(path for path in known_files
+                     if path.startswith(f"{INDEX_SOURCE_DIR}/") and get_extension(path) in IMPORT_GRAPH_EXTENSIONS)
+    
+    cached = {}
+    if cache_file:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f).get('files', {})
+        except (OSError, ValueError):
+            cached = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        hashes = list(pool.map(_hash_file, [os.path.join(start_path, path) for path in modules]))
+    
+    missing = {digest: path for path, digest in zip(modules, hashes) if digest is not None and digest not in cached}
+    if missing:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            parsed = pool.map(parse_imports, [os.path.join(start_path, path) for path in missing.values()],
+                              chunksize=32)
+            cached.update(zip(missing, parsed))
+    
+    aliases = load_import_aliases(start_path)
+    graph = {}
+    report = {}
+    for path, digest in zip(modules, hashes):
+        specifiers = cached.get(digest, [])
+        imports, external, unresolved = [], [], []
+        for specifier in specifiers:
+            target, package = resolve_import(specifier, path, aliases, known_files)
+            if target is not None:
+                imports.append(target)
+            elif package is not None:
+                external.append(package)
+            else:
+                unresolved.append(specifier)
+        graph[path] = imports
+        report[path] = {'imports': imports, 'external': sorted(set(external)), 'unresolved': unresolved}
+    
+    if cache_file:
+        # Solo se guardan los hashes de los archivos actuales
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'files': {digest: cached[digest] for digest in hashes if digest in cached}}, f)
+    
+    imported = {target for targets in graph.values() for target in targets}
+    entries = find_entry_points(start_path, known_files)
+    
+    reachable = set()
+    stack = [entry for entry in entries if entry in graph]
+    while stack:
+        module = stack.pop()
+        if module not in reachable:
+            reachable.add(module)
+            stack.extend(target for target in graph.get(module, ()) if target not in reachable)
+    
+    chains = _longest_chains(graph)
+    for path in modules:
+        report[path]['chain_depth'] = chains.get(path, 1)
+    
+    return {
+        'entries': entries,
+        'modules': report,
+        'orphans': [path for path in modules if path not in imported and path not in entries],
+        'unreachable': [path for path in modules if path not in reachable] if entries else [],
+    }
+
+# Extensiones en las que tiene sentido contar líneas
+TEXT_EXTENSIONS = {
+    '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs', '.css', '.scss', '.less', '.html', '.json',
+    '.md', '.txt', '.py', '.yml', '.yaml', '.xml', '.svg', '.sh', '.toml', '.ini', '.csv',
+}
+LINE_COUNT_CHUNK = 1 << 20
+
+# Un búfer de lectura por hilo del pool, reservado una sola vez
+_line_count_buffers = threading.local()
+
+def count_lines(path):
+    """
+    Cuenta las líneas de un archivo leyendo bloques binarios sobre el búfer
+    del hilo actual, sin decodificar el texto. Devuelve None si el archivo
+    parece binario (tiene un byte NUL en el primer bloque) o no se puede leer.
+    """
+    buffer = getattr(_line_count_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _line_count_buffers.buffer = bytearray(LINE_COUNT_CHUNK)
+    lines = 0
+    last_byte = None
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            first = True
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                if first and buffer.find(b'\0', 0, size) != -1:
+                    return None
+                first = False
+                lines += buffer.count(b'\n', 0, size)
+                last_byte = buffer[size - 1]
+    except OSError:
+        return None
+    
+    # Una última línea sin salto final también cuenta
+    if last_byte is not None and last_byte != ord('\n'):
+        lines += 1
+    return lines
+
+def compute_rollups(root_node, start_path, count_text_lines=True, max_workers=None):
+    """
+    Calcula los totales (bytes, archivos, líneas) de cada directorio de abajo
+    arriba en una sola pasada sobre los nodos. Los tamaños ya vienen del
+    listado (walk_directory_tree con sizes=True); las líneas de los archivos
+    de texto se cuentan en un pool de hilos.
+    """
+    # Orden en preorden; recorrido al revés, cada hijo se procesa antes que su padre
+    order = []
+    stack = [(root_node, start_path)]
+    while stack:
+        node, path = stack.pop()
+        order.append((node, path))
+        stack.extend((child, os.path.join(path, name)) for name, child in node.dirs.items())
+    
+    if count_text_lines:
+        text_files = [(node, index, os.path.join(path, name))
+                      for node, path in order
+                      for index, name in enumerate(node.files)
+                      if get_extension(name) in TEXT_EXTENSIONS]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            counts = pool.map(count_lines, [file_path for _, _, file_path in text_files])
+            per_node = {}
+            for (node, index, _), count in zip(text_files, counts):
+                per_node.setdefault(id(node), (node, {}))[1][index] = count
+        for node, counted in per_node.values():
+            node.lines = tuple(counted.get(index) for index in range(len(node.files)))
+    
+    for node, _ in reversed(order):
+        if node.summary is not None:
+            node.rollup = (node.summary.bytes, node.summary.files, 0)
+            continue
+        total_bytes = sum(node.sizes) if node.sizes is not None else 0
+        total_files = len(node.files)
+        total_lines = sum(count for count in node.lines if count) if node.lines is not None else 0
+        for child in node.dirs.values():
+            child_bytes, child_files, child_lines = child.rollup
+            total_bytes += child_bytes
+            total_files += child_files
+            total_lines += child_lines
+        node.rollup = (total_bytes, total_files, total_lines)
+
+def format_bytes(size):
+    """Formatea un tamaño en bytes de forma legible (B, KB, MB, GB)"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+class SizeAnnotator:
+    """
+    Añade a cada línea del árbol el tamaño, y las líneas de los archivos de texto,
+    a partir de los datos que deja compute_rollups en los nodos.
+    """
+    
+    def __init__(self):
+        self._indexed_node = None
+        self._index = {}
+    
+    def _file_index(self, node):
+        """Posición de cada archivo en node.files (se recuerda el último nodo consultado)"""
+        if self._indexed_node is not node:
+            self._indexed_node = node
+            self._index = {name: index for index, name in enumerate(node.files)}
+        return self._index
+    
+    def dir_label(self, node):
+        if node is None or node.rollup is None:
+            return ''
+        total_bytes, total_files, total_lines = node.rollup
+        lines = f", {total_lines} líneas" if total_lines else ''
+        return f" [{format_bytes(total_bytes)}, {total_files} archivos{lines}]"
+    
+    def pattern_label(self, node, files):
+        if node.sizes is None:
+            return ''
+        index = self._file_index(node)
+        return f" [{format_bytes(sum(node.sizes[index[name]] for name in files))}]"
+    
+    def file_label(self, node, filename):
+        if node.sizes is None:
+            return ''
+        position = self._file_index(node)[filename]
+        lines = node.lines[position] if node.lines is not None else None
+        if lines is None:
+            return f" [{format_bytes(node.sizes[position])}]"
+        return f" [{format_bytes(node.sizes[position])}, {lines} líneas]"
+
+class ChainedAnnotator:
+    """
+    Base de los anotadores que pueden envolver otro (base), como SizeAnnotator:
+    cada etiqueta es la del anotador envuelto seguida de la propia, que las
+    subclases calculan en _own_dir_label, _own_pattern_label y _own_file_label
+    (por defecto, vacías).
+    """
+    
+    def __init__(self, base=None):
+        self.base = base
+    
+    def dir_label(self, node):
+        label = self.base.dir_label(node) if self.base is not None else ''
+        return label + self._own_dir_label(node)
+    
+    def pattern_label(self, node, files):
+        label = self.base.pattern_label(node, files) if self.base is not None else ''
+        return label + self._own_pattern_label(node, files)
+    
+    def file_label(self, node, filename):
+        label = self.base.file_label(node, filename) if self.base is not None else ''
+        return label + self._own_file_label(node, filename)
+    
+    def _own_dir_label(self, node):
+        return ''
+    
+    def _own_pattern_label(self, node, files):
+        return ''
+    
+    def _own_file_label(self, node, filename):
+        return ''
+
+# Bytes que se comparan del principio y del final antes de leer el archivo entero
+DUPLICATE_PROBE_SIZE = 4096
+
+def _probe_hash(path, size):
+    """Hash del principio y del final de un archivo; en los pequeños cubre todo el contenido"""
+    try:
+        with open(path, 'rb') as f:
+            if size <= 2 * DUPLICATE_PROBE_SIZE:
+                data = f.read()
+            else:
+                data = f.read(DUPLICATE_PROBE_SIZE)
+                f.seek(-DUPLICATE_PROBE_SIZE, os.SEEK_END)
+                data += f.read()
+    except OSError:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
+def _full_hash(path):
+    """SHA-1 del archivo completo leído con mmap, sin copiarlo a la memoria de Python"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return hashlib.sha1(data).hexdigest()
+    except (OSError, ValueError):
+        return None
+
+def find_duplicates(root_node, start_path, max_workers=None):
+    """
+    Busca archivos con el mismo contenido leyendo lo mínimo posible:
+    
+    1. Agrupa por tamaño (los nodos ya lo traen si se recorrió con sizes=True).
+    2. Dentro de cada tamaño repetido, compara un hash del principio y del final.
+    3. Solo los que siguen coincidiendo se leen enteros, con mmap.
+    
+    Los hashes se calculan en un pool de hilos (hashlib libera el GIL en
+    bloques grandes). Los archivos vacíos se ignoran. Devuelve una lista de
+    grupos (tamaño, hash, [(ruta relativa, nodo, nombre)]) ordenada por los
+    bytes repetidos, de mayor a menor.
+    """
+    by_size = defaultdict(list)
+    stack = [(root_node, '')]
+    while stack:
+        node, rel = stack.pop()
+        prefix = f"{rel}/" if rel else ''
+        for index, name in enumerate(node.files):
+            if node.sizes is not None:
+                size = node.sizes[index]
+            else:
+                try:
+                    size = os.stat(os.path.join(start_path, prefix + name)).st_size
+                except OSError:
+                    continue
+            if size:
+                by_size[size].append((prefix + name, node, name))
+        stack.extend((child, prefix + name) for name, child in node.dirs.items())
+    
+    def path_of(entry):
+        return os.path.join(start_path, entry[0])
+    
+    groups = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        probe_items = [(size, entry) for size, entries in by_size.items() if len(entries) > 1 for entry in entries]
+        probes = pool.map(lambda item: _probe_hash(path_of(item[1]), item[0]), probe_items)
+        by_probe = defaultdict(list)
+        for (size, entry), digest in zip(probe_items, probes):
+            if digest is not None:
+                by_probe[(size, digest)].append(entry)
+        
+        full_items = []
+        for key, entries in by_probe.items():
+            if len(entries) < 2:
+                continue
+            if key[0] <= 2 * DUPLICATE_PROBE_SIZE:
+                # El hash parcial ya cubrió el archivo entero
+                groups[key] = entries
+            else:
+                full_items.extend((key[0], entry) for entry in entries)
+        
+        digests = pool.map(lambda item: _full_hash(path_of(item[1])), full_items)
+        for (size, entry), digest in zip(full_items, digests):
+            if digest is not None:
+                groups.setdefault((size, digest), []).append(entry)
+    
+    result = [(size, digest, sorted(entries, key=lambda entry: entry[0]))
+              for (size, digest), entries in groups.items() if len(entries) > 1]
+    result.sort(key=lambda group: (-group[0] * (len(group[2]) - 1), group[2][0][0]))
+    return result
+
+class DuplicateAnnotator(ChainedAnnotator):
+    """
+    Marca en el árbol los archivos duplicados con el número de su grupo
+    (el mismo que en el informe). Si se le pasa otro anotador, como
+    SizeAnnotator, añade sus marcas después de las de ese anotador.
+    """
+    
+    def __init__(self, groups, base=None):
+        super().__init__(base)
+        self.marks = {}
+        for number, (_, _, entries) in enumerate(groups, 1):
+            for _, node, name in entries:
+                self.marks.setdefault(node, {})[name] = number
+    
+    def _own_pattern_label(self, node, files):
+        marks = self.marks.get(node)
+        duplicated = sum(1 for name in files if name in marks) if marks else 0
+        return f" [{duplicated} duplicados]" if duplicated else ''
+    
+    def _own_file_label(self, node, filename):
+        number = self.marks.get(node, {}).get(filename)
+        return f" [duplicado #{number}]" if number is not None else ''
 
-def is_image_directory(files):
-    """Determina si un directorio contiene principalmente imágenes"""
-    if not files:
-        return False
+def write_duplicate_report(groups, output_file):
+    """Guarda los grupos de duplicados en JSON y muestra un resumen"""
+    wasted = sum(size * (len(entries) - 1) for size, _, entries in groups)
+    report = {
+        'groups': [{'id': number, 'size': size, 'sha1': digest, 'files': [entry[0] for entry in entries]}
+                   for number, (size, digest, entries) in enumerate(groups, 1)],
+        'wasted_bytes': wasted,
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
     
-    image_count = sum(1 for f in files if is_image_file(f))
-    return image_count / len(files) >= 0.5  # Si más del 50% son imágenes
+    print(f"Duplicados guardados en '{output_file}': {len(groups)} grupos, {format_bytes(wasted)} repetidos")
+    for number, (size, _, entries) in enumerate(groups[:5], 1):
+        print(f"  #{number}: {len(entries)} copias de {format_bytes(size)} ({entries[0][0]}...)")
 
-def should_condense(files, threshold=10, is_img_dir=False):
+# Caracteres que se leen de golpe al procesar informes JSON grandes
+JSON_STREAM_CHUNK = 1 << 16
+
+def iter_json_array(stream, chunk_size=JSON_STREAM_CHUNK):
     """
-    Determina si un conjunto de archivos debe condensarse basado en patrones similares
-    y aplica un umbral más bajo para directorios de imágenes
+    Recorre los elementos de un array JSON de primer nivel leyendo el archivo
+    por bloques, sin cargar el documento entero: cada elemento se decodifica
+    con JSONDecoder.raw_decode en cuanto está completo en el búfer, y el búfer
+    solo guarda el elemento en curso. Si un elemento no cabe, se lee el doble.
     """
-    # Umbral más bajo para directorios de imágenes
-    if is_img_dir:
-        threshold = min(threshold, 5)  # Aplica un umbral más bajo para imágenes
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
     
-    if len(files) < threshold:
-        return False
+    def fill(size):
+        nonlocal buffer, pos, eof
+        chunk = stream.read(size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
     
-    # Analizar patrones en los nombres de archivos
-    extensions = Counter([get_extension(f) for f in files])
+    def next_token():
+        # Salta espacios hasta el siguiente carácter significativo
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos] if pos < len(buffer) else ''
+            fill(chunk_size)
     
-    # Buscar patrones comunes en nombres de archivos
-    prefixes = Counter()
-    for file in files:
-        base = get_base_name(file)
-        prefix = '-'.join(base.split('-')[:-1]) if '-' in base else base
-        prefixes[prefix] += 1
+    if next_token() != '[':
+        raise ValueError("El informe no es un array JSON")
+    pos += 1
+    if next_token() == ']':
+        return
     
-    # Si hay muchos archivos con el mismo prefijo o extensión, condensar
-    return any(count >= threshold/2 for count in extensions.values()) or \
-           any(count >= threshold/2 for count in prefixes.values())
+    read_size = chunk_size
+    while True:
+        next_token()
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        # Un número que acaba al final del búfer, o ante '.', 'e'... puede estar
+        # cortado ('12' de '1234', '1' de '1.5'): se lee más antes de aceptarlo
+        if end is None or (not eof and (end == len(buffer) or buffer[end] in '0123456789.eE+-')):
+            fill(read_size)
+            read_size *= 2
+            continue
+        read_size = chunk_size
+        pos = end
+        yield value
+        
+        separator = next_token()
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"Se esperaba ',' o ']' en el informe y se encontró {separator!r}")
 
-def generate_directory_tree(start_path='.', output_file='directory_structure.txt', exclude_dirs=None, notes=None, condensation_threshold=10):
+class ReportPathResolver:
     """
-    Genera un archivo de texto con la estructura de directorios mejorada y condensada
-    
-    Args:
-        start_path: Directorio inicial para comenzar la exploración
-        output_file: Nombre del archivo donde se guardará la estructura
-        exclude_dirs: Lista de directorios a excluir
-        notes: Diccionario con patrones de archivos y notas a añadir
-        condensation_threshold: Número mínimo de archivos para considerar condensación
+    Relaciona las rutas de informes externos (ESLint, visualizador del bundle)
+    con el árbol. Suelen ser absolutas en la máquina donde se generaron, así
+    que se busca el sufijo más largo que coincide con un archivo del árbol y
+    el prefijo encontrado se reutiliza para las siguientes rutas.
     """
-    if exclude_dirs is None:
-        exclude_dirs = ['venv', '__pycache__', '.git', '.idea', 'node_modules', 'dist', 'build']
     
-    if notes is None:
-        notes = {}
+    def __init__(self, known_files=()):
+        self.known_files = set(known_files)
+        self.base = None
     
-    # Obtener el nombre del directorio raíz
-    root_name = os.path.basename(os.path.abspath(start_path))
+    def relative_path(self, file_path):
+        """Ruta relativa al árbol de una ruta del informe, o None si no se reconoce"""
+        file_path = file_path.replace('\\', '/')
+        if self.base is not None and file_path.startswith(self.base):
+            return file_path[len(self.base):]
+        parts = file_path.split('/')
+        for index in range(1, len(parts)):
+            candidate = '/'.join(parts[index:])
+            if candidate in self.known_files:
+                self.base = '/'.join(parts[:index]) + '/'
+                return candidate
+        return None
+
+class LintSummary:
+    """
+    Totales de un informe de ESLint (--format json): errores y avisos por
+    archivo, por directorio (acumulados hacia arriba) y por regla.
+    """
     
-    # Estructura para almacenar el árbol de directorios
-    tree = {}
+    def __init__(self, known_files=()):
+        self.resolver = ReportPathResolver(known_files)
+        self.by_file = {}
+        self.by_dir = defaultdict(lambda: [0, 0])
+        self.by_rule = defaultdict(lambda: [0, 0])
     
-    # Recopilar la estructura de directorios
-    for root, dirs, files in os.walk(start_path):
-        # Excluir directorios no deseados
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        
-        # Ignorar el directorio raíz en la estructura relativa
-        rel_path = os.path.relpath(root, start_path)
+    def add(self, result):
+        """Suma el resultado de un archivo (un elemento del array del informe)"""
+        errors = result.get('errorCount', 0)
+        warnings = result.get('warningCount', 0)
+        for message in result.get('messages', ()):
+            counts = self.by_rule[message.get('ruleId') or '(sin regla)']
+            counts[0 if message.get('severity') == 2 else 1] += 1
+        if not errors and not warnings:
+            return
         
-        # Excluir archivos ocultos y .DS_Store
-        files = [f for f in files if not f.startswith('.') and f != '.DS_Store']
+        rel = self.resolver.relative_path(result.get('filePath', ''))
+        if rel is None:
+            return
+        self.by_file[rel] = (errors, warnings)
+        directory = rel
+        while directory:
+            directory = directory.rpartition('/')[0]
+            counts = self.by_dir[directory]
+            counts[0] += errors
+            counts[1] += warnings
+
+def read_lint_report(report_file, root_node):
+    """Lee un informe de ESLint en streaming y lo resume sobre los archivos del árbol"""
+    summary = LintSummary(iter_tree_files(root_node))
+    with open(report_file, 'r', encoding='utf-8') as f:
+        for result in iter_json_array(f):
+            summary.add(result)
+    return summary
+
+def _node_paths(root_node):
+    """Ruta relativa de cada nodo del árbol, para los anotadores que trabajan con rutas"""
+    paths = {}
+    stack = [(root_node, '')]
+    while stack:
+        node, rel = stack.pop()
+        paths[node] = rel
+        stack.extend((child, f"{rel}/{name}" if rel else name) for name, child in node.dirs.items())
+    return paths
+
+def _lint_label(counts):
+    if not counts or not (counts[0] or counts[1]):
+        return ''
+    return f" [lint: {counts[0]} errores, {counts[1]} avisos]"
+
+class LintAnnotator(ChainedAnnotator):
+    """
+    Añade a cada línea del árbol los errores y avisos de lint de su archivo,
+    patrón condensado o directorio. Como DuplicateAnnotator, puede envolver
+    otro anotador.
+    """
+    
+    def __init__(self, summary, root_node, base=None):
+        super().__init__(base)
+        self.summary = summary
+        self.paths = _node_paths(root_node)
+    
+    def _file_path(self, node, filename):
+        rel = self.paths.get(node, '')
+        return f"{rel}/{filename}" if rel else filename
+    
+    def _own_dir_label(self, node):
+        rel = self.paths.get(node)
+        return _lint_label(self.summary.by_dir.get(rel)) if rel is not None else ''
+    
+    def _own_pattern_label(self, node, files):
+        counts = [0, 0]
+        for name in files:
+            file_counts = self.summary.by_file.get(self._file_path(node, name))
+            if file_counts:
+                counts[0] += file_counts[0]
+                counts[1] += file_counts[1]
+        return _lint_label(counts)
+    
+    def _own_file_label(self, node, filename):
+        return _lint_label(self.summary.by_file.get(self._file_path(node, filename)))
+
+def print_lint_summary(summary, report_file, top=5):
+    """Muestra los totales del informe y las reglas con más incidencias"""
+    errors, warnings = summary.by_dir.get('', (0, 0))
+    print(f"Lint de '{report_file}': {errors} errores y {warnings} avisos en {len(summary.by_file)} archivos")
+    rules = sorted(summary.by_rule.items(), key=lambda item: (-sum(item[1]), item[0]))
+    for rule, (rule_errors, rule_warnings) in rules[:top]:
+        print(f"  {rule}: {rule_errors} errores, {rule_warnings} avisos")
+
+_JS_LITERAL_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<punct>[{}\[\]:,])
+""", re.VERBOSE | re.DOTALL)
+
+def _js_string_to_json(token):
+    """Convierte una cadena JS (comillas simples o dobles) en una cadena JSON"""
+    body = token[1:-1]
+    if token[0] == "'":
+        body = re.sub(r"\\(.)|\"", lambda m: '\\"' if m.group(0) == '"' else ("'" if m.group(1) == "'" else m.group(0)),
+                      body, flags=re.DOTALL)
+    return '"' + re.sub(r'\\x([0-9a-fA-F]{2})', r'\\u00\1', body) + '"'
+
+def parse_js_object(text, start):
+    """
+    Lee el literal de objeto JS que empieza en text[start] ('{') y lo devuelve
+    como datos de Python. Admite la salida JSON del visualizador y también el
+    mismo literal reformateado por Prettier (claves sin comillas, comillas
+    simples, comas finales); no evalúa expresiones.
+    """
+    pieces = []
+    depth = 0
+    pos = start
+    while True:
+        match = _JS_LITERAL_TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ValueError(f"Carácter inesperado en el literal JS en la posición {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        token = match.group()
         
-        # Determinar si es un directorio de imágenes
-        is_img_dir = is_image_directory(files)
+        if kind == 'space':
+            continue
+        if kind == 'string':
+            pieces.append(_js_string_to_json(token))
+        elif kind == 'word':
+            if token in ('true', 'false', 'null'):
+                pieces.append(token)
+            else:
+                # Clave sin comillas
+                pieces.append(json.dumps(token))
+        elif kind == 'number':
+            pieces.append(token)
+        else:
+            if token in '}]':
+                if pieces and pieces[-1] == ',':
+                    pieces.pop()
+                depth -= 1
+            elif token in '{[':
+                depth += 1
+            pieces.append(token)
+            if depth == 0:
+                return json.loads(''.join(pieces))
+
+def read_visualizer_stats(html_file):
+    """
+    Extrae los datos incrustados en el stats.html de rollup-plugin-visualizer
+    (const data = {...}) sin ejecutar el HTML.
+    """
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html = f.read()
+    match = re.search(r'\bconst\s+data\s*=\s*\{', html)
+    if match is None:
+        raise ValueError(f"'{html_file}' no contiene los datos del visualizador")
+    return parse_js_object(html, match.end() - 1)
+
+class BundleSizes:
+    """
+    Bytes que aporta cada módulo al bundle (renderizados y con gzip), por
+    archivo y acumulados por directorio, a partir de nodeMetas/nodeParts.
+    La raíz acumula el bundle entero, incluidas las dependencias.
+    """
+    
+    def __init__(self, data, known_files=()):
+        resolver = ReportPathResolver(known_files)
+        parts = data.get('nodeParts', {})
+        self.by_file = {}
+        self.by_dir = defaultdict(lambda: [0, 0])
         
-        # Agrupar archivos por nombre base (sin extensión)
-        files_by_base = defaultdict(list)
-        for file in files:
-            base_name = get_base_name(file)
-            files_by_base[base_name].append(file)
+        for meta in data.get('nodeMetas', {}).values():
+            module_id = meta.get('id', '')
+            if module_id.startswith('\0'):
+                # Módulos virtuales de los plugins (helpers de commonjs...)
+                continue
+            rendered = gzip = 0
+            for part_uid in meta.get('moduleParts', {}).values():
+                part = parts.get(part_uid, {})
+                rendered += part.get('renderedLength', 0)
+                gzip += part.get('gzipLength', 0)
+            if not rendered:
+                continue
+            
+            rel = resolver.relative_path(module_id.split('?', 1)[0])
+            if rel is None:
+                self.by_dir[''][0] += rendered
+                self.by_dir[''][1] += gzip
+                continue
+            counts = self.by_file.setdefault(rel, [0, 0])
+            counts[0] += rendered
+            counts[1] += gzip
+            directory = rel
+            while directory:
+                directory = directory.rpartition('/')[0]
+                self.by_dir[directory][0] += rendered
+                self.by_dir[directory][1] += gzip
         
-        # Almacenar en la estructura
-        if rel_path == '.':
-            tree[root_name] = {'dirs': {}, 'files': files_by_base, 'all_files': files, 'is_img_dir': is_img_dir}
+        self.total = self.by_dir[''][0] if '' in self.by_dir else 0
+
+class BundleAnnotator(ChainedAnnotator):
+    """
+    Añade a cada línea los bytes que su archivo, patrón o directorio aporta
+    al bundle y su porcentaje del total, para ver qué carpetas pesan más.
+    Como el resto de anotadores, puede envolver otro.
+    """
+    
+    def __init__(self, bundle, root_node, base=None):
+        super().__init__(base)
+        self.bundle = bundle
+        self.paths = _node_paths(root_node)
+    
+    def _label(self, counts):
+        if not counts or not counts[0]:
+            return ''
+        share = counts[0] * 100 / self.bundle.total if self.bundle.total else 0
+        return f" [bundle: {format_bytes(counts[0])}, gzip {format_bytes(counts[1])}, {share:.1f}%]"
+    
+    def _own_dir_label(self, node):
+        rel = self.paths.get(node)
+        return self._label(self.bundle.by_dir.get(rel)) if rel is not None else ''
+    
+    def _own_pattern_label(self, node, files):
+        rel = self.paths.get(node, '')
+        counts = [0, 0]
+        for name in files:
+            file_counts = self.bundle.by_file.get(f"{rel}/{name}" if rel else name)
+            if file_counts:
+                counts[0] += file_counts[0]
+                counts[1] += file_counts[1]
+        return self._label(counts)
+    
+    def _own_file_label(self, node, filename):
+        rel = self.paths.get(node, '')
+        return self._label(self.bundle.by_file.get(f"{rel}/{filename}" if rel else filename))
+
+def print_bundle_summary(bundle, stats_file, top=10):
+    """Muestra el tamaño total del bundle y los directorios y archivos que más aportan"""
+    print(f"Bundle de '{stats_file}': {format_bytes(bundle.total)} "
+          f"({format_bytes(bundle.by_dir[''][1])} con gzip)")
+    heaviest = sorted(
+        [(counts[0], f"{rel}/") for rel, counts in bundle.by_dir.items() if rel]
+        + [(counts[0], rel) for rel, counts in bundle.by_file.items()],
+        reverse=True)
+    for size, path in heaviest[:top]:
+        print(f"  {format_bytes(size):>10}  {path}")
+
+# Directorios de recursos estáticos que revisa el inventario de imágenes
+ASSET_DIRS = ('public', 'src/assets')
+# Formato que corresponde a cada extensión de imagen
+IMAGE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.gif': 'GIF', '.webp': 'WebP',
+                 '.ico': 'ICO', '.svg': 'SVG', '.bmp': 'BMP', '.tiff': 'TIFF'}
+# Límites a partir de los cuales una imagen se marca como demasiado grande
+ASSET_MAX_BYTES = 500 * 1024
+ASSET_MAX_SIDE = 2560
+# Bytes que se leen del principio de cada imagen (los SVG necesitan algo más para llegar a <svg>)
+IMAGE_HEADER_SIZE = 512
+SVG_HEADER_SIZE = 4096
+
+_SVG_TAG_RE = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE | re.DOTALL)
+_SVG_ATTRIBUTE_RE = re.compile(rb'\b(viewBox|width|height)\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+
+def _jpeg_dimensions(f):
+    """Recorre los segmentos JPEG con seek hasta el marcador SOF, leyendo solo sus cabeceras"""
+    f.seek(2)
+    while True:
+        marker = f.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None, None
+        code, length = marker[1], struct.unpack('>H', marker[2:])[0]
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None, None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+# Etiquetas TIFF de ancho y alto, y tamaño de sus tipos SHORT (3) y LONG (4)
+TIFF_WIDTH_TAG = 256
+TIFF_HEIGHT_TAG = 257
+_TIFF_TYPE_FORMATS = {3: 'H', 4: 'I'}
+
+def _tiff_dimensions(f, header):
+    """Lee el primer IFD del TIFF (con seek a su posición) y busca en él el ancho y el alto"""
+    order = '<' if header[:2] == b'II' else '>'
+    f.seek(struct.unpack(f'{order}I', header[4:8])[0])
+    data = f.read(2)
+    if len(data) < 2:
+        return None, None
+    count = struct.unpack(f'{order}H', data)[0]
+    entries = f.read(12 * count)
+    dimensions = {}
+    for pos in range(0, len(entries) - 11, 12):
+        tag, kind = struct.unpack(f'{order}HH', entries[pos:pos + 4])
+        if tag in (TIFF_WIDTH_TAG, TIFF_HEIGHT_TAG) and kind in _TIFF_TYPE_FORMATS:
+            dimensions[tag] = struct.unpack_from(f'{order}{_TIFF_TYPE_FORMATS[kind]}', entries, pos + 8)[0]
+    return dimensions.get(TIFF_WIDTH_TAG), dimensions.get(TIFF_HEIGHT_TAG)
+
+def _svg_dimensions(header):
+    """Ancho y alto del viewBox (o de width/height) de la etiqueta <svg>"""
+    tag = _SVG_TAG_RE.search(header)
+    if tag is None:
+        return None, None
+    attributes = {name.lower(): value for name, value in _SVG_ATTRIBUTE_RE.findall(tag.group())}
+    try:
+        if b'viewbox' in attributes:
+            _, _, width, height = attributes[b'viewbox'].replace(b',', b' ').split()
         else:
-            # Navegar por el árbol para encontrar el directorio correcto
-            current = tree[root_name]
-            parts = rel_path.split(os.sep)
+            width, height = attributes[b'width'], attributes[b'height']
+        return round(float(re.sub(rb'[a-z%]+$', b'', width))), round(float(re.sub(rb'[a-z%]+$', b'', height)))
+    except (KeyError, ValueError):
+        return None, None
+
+def read_image_header(path):
+    """
+    Identifica una imagen por su cabecera, sin decodificarla: devuelve
+    (formato, ancho, alto, bytes). Lee unos cientos de bytes (los JPEG, solo
+    las cabeceras de sus segmentos hasta el SOF; los TIFF, su primer IFD). El
+    formato es None si la cabecera no es de PNG, JPEG, GIF, WebP, ICO, BMP,
+    TIFF ni SVG; el tamaño, None si no se puede leer el archivo.
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            header = f.read(IMAGE_HEADER_SIZE)
             
-            for part in parts:
-                if part not in current['dirs']:
-                    current['dirs'][part] = {'dirs': {}, 'files': {}, 'all_files': [], 'is_img_dir': False}
-                current = current['dirs'][part]
+            if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+                width, height = struct.unpack('>II', header[16:24])
+                return 'PNG', width, height, size
+            if header.startswith(b'\xff\xd8'):
+                return ('JPEG',) + _jpeg_dimensions(f) + (size,)
+            if header[:6] in (b'GIF87a', b'GIF89a'):
+                width, height = struct.unpack('<HH', header[6:10])
+                return 'GIF', width, height, size
+            if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+                chunk = header[12:16]
+                if chunk == b'VP8 ' and len(header) >= 30:
+                    width, height = struct.unpack('<HH', header[26:30])
+                    return 'WebP', width & 0x3fff, height & 0x3fff, size
+                if chunk == b'VP8L' and len(header) >= 25:
+                    bits = int.from_bytes(header[21:25], 'little')
+                    return 'WebP', (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1, size
+                if chunk == b'VP8X' and len(header) >= 30:
+                    return ('WebP', int.from_bytes(header[24:27], 'little') + 1,
+                            int.from_bytes(header[27:30], 'little') + 1, size)
+                return 'WebP', None, None, size
+            if header[:4] == b'\0\0\1\0' and len(header) >= 6:
+                # ICO: se toma la mayor de las imágenes del directorio (0 significa 256 px)
+                count = struct.unpack('<H', header[4:6])[0]
+                entries = [header[6 + 16 * i:8 + 16 * i] for i in range(count) if 8 + 16 * i <= len(header)]
+                sides = [(entry[0] or 256, entry[1] or 256) for entry in entries]
+                width, height = max(sides) if sides else (None, None)
+                return 'ICO', width, height, size
+            if header[:2] == b'BM' and len(header) >= 26:
+                # BMP: BITMAPCOREHEADER (12 bytes) con lados de 16 bits; los demás, de 32 con signo
+                if struct.unpack('<I', header[14:18])[0] == 12:
+                    width, height = struct.unpack('<HH', header[18:22])
+                else:
+                    width, height = struct.unpack('<ii', header[18:26])
+                return 'BMP', abs(width), abs(height), size
+            if header[:4] in (b'II*\0', b'MM\0*') and len(header) >= 8:
+                return ('TIFF',) + _tiff_dimensions(f, header) + (size,)
             
-            current['files'] = files_by_base
-            current['all_files'] = files
-            current['is_img_dir'] = is_img_dir
+            if b'<svg' in header.lower() or header.lstrip().startswith((b'<?xml', b'<!--')):
+                header += f.read(SVG_HEADER_SIZE - len(header))
+                if _SVG_TAG_RE.search(header):
+                    return ('SVG',) + _svg_dimensions(header) + (size,)
+            return None, None, None, size
+    except OSError:
+        return None, None, None, None
+
+def _asset_problems(name, image_format, width, height, size):
+    """Problemas de una imagen: formato que no corresponde a la extensión o tamaño excesivo"""
+    problems = []
+    expected = IMAGE_FORMATS.get(get_extension(name))
+    if size == 0:
+        problems.append("vacío")
+    elif image_format is None:
+        problems.append("cabecera no reconocida")
+    elif expected is not None and image_format != expected:
+        problems.append(f"es {image_format}")
+    if size and size > ASSET_MAX_BYTES:
+        problems.append(f"pesa {format_bytes(size)}")
+    if width and height and max(width, height) > ASSET_MAX_SIDE:
+        problems.append(f"{width}×{height} px")
+    return problems
+
+def _asset_images(root_node, asset_dirs):
+    """Imágenes (nodo, nombre, ruta relativa) que cuelgan de los directorios de recursos"""
+    images = []
+    for asset_dir in asset_dirs:
+        node = root_node
+        for part in asset_dir.split('/'):
+            node = node.dirs.get(part) if node is not None else None
+        if node is None:
+            continue
+        stack = [(node, asset_dir)]
+        while stack:
+            current, rel = stack.pop()
+            images.extend((current, name, f"{rel}/{name}") for name in current.files if is_image_file(name))
+            stack.extend((child, f"{rel}/{name}") for name, child in current.dirs.items())
+    return images
+
+class AssetInventory:
+    """
+    Inventario de las imágenes de public/ y src/assets: formato real,
+    dimensiones, bytes y problemas de cada una, a partir solo de su cabecera.
+    
+    images: {ruta relativa: (formato, ancho, alto, bytes, problemas)}
+    names: {nodo: {nombre: ruta relativa}}, para anotar el árbol
+    """
     
-    # Escribir el árbol a un archivo
+    def __init__(self, root_node, start_path, asset_dirs=ASSET_DIRS, max_workers=None):
+        found = _asset_images(root_node, asset_dirs)
+        self.images = {}
+        self.names = defaultdict(dict)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            headers = pool.map(read_image_header, [os.path.join(start_path, rel) for _, _, rel in found])
+            for (node, name, rel), (image_format, width, height, size) in zip(found, headers):
+                self.images[rel] = (image_format, width, height, size,
+                                    _asset_problems(name, image_format, width, height, size))
+                self.names[node][name] = rel
+    
+    def folders(self):
+        """Totales por carpeta: {carpeta: {'files', 'total_bytes', 'largest', 'problems'}}"""
+        folders = {}
+        for rel in sorted(self.images):
+            image_format, width, height, size, problems = self.images[rel]
+            folder, _, name = rel.rpartition('/')
+            summary = folders.setdefault(folder, {'files': 0, 'total_bytes': 0, 'largest': None, 'problems': []})
+            summary['files'] += 1
+            summary['total_bytes'] += size or 0
+            if size and (summary['largest'] is None or size > summary['largest']['bytes']):
+                summary['largest'] = {'file': name, 'bytes': size}
+            if problems:
+                summary['problems'].append({'file': name, 'format': image_format, 'width': width,
+                                            'height': height, 'bytes': size, 'problems': problems})
+        return folders
+
+class AssetAnnotator(ChainedAnnotator):
+    """
+    Añade el formato, las dimensiones y el peso a cada imagen del inventario,
+    y a los patrones condensados su peso total y la imagen más grande.
+    Las imágenes con problemas se marcan con ⚠. Puede envolver otro anotador.
+    """
+    
+    def __init__(self, inventory, base=None):
+        super().__init__(base)
+        self.inventory = inventory
+    
+    def _own_pattern_label(self, node, files):
+        names = self.inventory.names.get(node)
+        if not names:
+            return ''
+        total = 0
+        largest = None
+        flagged = 0
+        for name in files:
+            rel = names.get(name)
+            if rel is None:
+                continue
+            _, _, _, size, problems = self.inventory.images[rel]
+            total += size or 0
+            if size and (largest is None or size > largest[1]):
+                largest = (name, size)
+            flagged += bool(problems)
+        if largest is None:
+            return ''
+        warning = f" ⚠ {flagged} con problemas" if flagged else ''
+        return f" [total {format_bytes(total)}, mayor: {largest[0]} {format_bytes(largest[1])}]{warning}"
+    
+    def _own_file_label(self, node, filename):
+        rel = self.inventory.names.get(node, {}).get(filename)
+        if rel is None:
+            return ''
+        image_format, width, height, size, problems = self.inventory.images[rel]
+        details = [image_format or '?']
+        if width and height:
+            details[0] += f" {width}×{height}"
+        if size is not None:
+            details.append(format_bytes(size))
+        warning = f" ⚠ {', '.join(problems)}" if problems else ''
+        return f" [{', '.join(details)}]{warning}"
+
+def write_asset_report(inventory, output_file):
+    """Guarda el inventario por carpeta en JSON y muestra las carpetas con problemas"""
+    folders = inventory.folders()
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"{root_name}/\n")
-        write_tree(f, tree[root_name], '', notes, condensation_threshold)
+        json.dump(folders, f, ensure_ascii=False, indent=2)
     
-    print(f"Estructura de directorios guardada en '{output_file}'")
+    flagged = sum(len(summary['problems']) for summary in folders.values())
+    print(f"Inventario de imágenes guardado en '{output_file}': {len(inventory.images)} imágenes, "
+          f"{flagged} con problemas")
+    for folder, summary in folders.items():
+        if summary['problems']:
+            print(f"  {folder}/: {len(summary['problems'])} de {summary['files']} "
+                  f"({format_bytes(summary['total_bytes'])} en total)")
 
-def analyze_patterns(files):
-    """Analiza patrones en los nombres de archivos para agruparlos mejor"""
-    patterns = {}
+def write_import_graph(root_node, start_path, output_file, cache_file=None, max_workers=None):
+    """Guarda el grafo de imports en JSON y muestra un resumen"""
+    graph = build_import_graph(root_node, start_path, cache_file, max_workers)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False, indent=2)
     
-    # Buscar patrones por extensión
-    by_extension = defaultdict(list)
-    for f in files:
-        ext = get_extension(f)
-        by_extension[ext].append(f)
+    deepest = sorted(graph['modules'].items(), key=lambda item: item[1]['chain_depth'], reverse=True)[:5]
+    print(f"Grafo de imports guardado en '{output_file}': {len(graph['modules'])} módulos, "
+          f"{len(graph['orphans'])} huérfanos, {len(graph['unreachable'])} inalcanzables")
+    for path, info in deepest:
+        print(f"  cadena de {info['chain_depth']} niveles desde {path}")
+
+def analyze_patterns(files, analysis=None):
+    """Analiza patrones en los nombres de archivos para agruparlos mejor"""
+    if analysis is None:
+        analysis = DirectoryAnalysis(files)
+    by_extension = analysis.by_extension
+    # Para elegir el método, un prefijo con '-' cuenta aunque tenga un solo
+    # archivo (como siempre); las secuencias con '_' o número final solo
+    # cuentan si agrupan al menos dos, porque casi cualquier nombre forma una
+    sequences = {pattern: group for pattern, group in analysis.sequences.items()
+                 if len(group) > 1 or pattern.endswith('-*')}
     
-    # Buscar patrones por prefijo común
-    by_prefix = defaultdict(list)
-    for f in files:
-        base = get_base_name(f)
-        prefix = '-'.join(base.split('-')[:-1]) if '-' in base else ''
-        if prefix:
-            by_prefix[prefix].append(f)
+    # Si todos los archivos son imágenes con la misma extensión, condensa todo el directorio
+    if len(by_extension) == 1 and analysis.image_count == len(files):
+        ext = next(iter(by_extension))
+        return {f"*{ext}": list(files)}
     
     # Determinar el mejor método para condensar
-    if len(by_extension) < len(by_prefix) and any(len(files) > 3 for files in by_extension.values()):
+    patterns = {}
+    if len(by_extension) < len(sequences) and any(len(group) > 3 for group in by_extension.values()):
         for ext, files_list in by_extension.items():
             if len(files_list) > 3:
                 patterns[f"*{ext}"] = files_list
-    elif any(len(files) > 3 for files in by_prefix.values()):
-        for prefix, files_list in by_prefix.items():
+    elif any(len(group) > 3 for group in sequences.values()):
+        for pattern, files_list in sequences.items():
             if len(files_list) > 3:
-                patterns[f"{prefix}-*"] = files_list
-    
-    # Si todos los archivos son imágenes con la misma extensión, condensa todo el directorio
-    if len(by_extension) == 1 and all(is_image_file(f) for f in files):
-        ext = list(by_extension.keys())[0]
-        patterns = {f"*{ext}": files}
+                patterns[pattern] = files_list
     
     return patterns
 
-def condense_image_directory(files):
+def condense_image_directory(files, analysis=None):
     """Condensa un directorio de imágenes en un solo patrón"""
-    extensions = Counter([get_extension(f) for f in files])
-    most_common_ext = extensions.most_common(1)[0][0] if extensions else ""
+    if analysis is None:
+        analysis = DirectoryAnalysis(files)
+    if not analysis.by_extension:
+        return {}
     
-    if most_common_ext:
-        return {f"*{most_common_ext}": [f for f in files if f.endswith(most_common_ext)]}
-    return {}
+    # La extensión más frecuente; en caso de empate, la que aparece primero
+    ext, files_list = max(analysis.by_extension.items(), key=lambda item: len(item[1]))
+    return {f"*{ext}": files_list}
 
-def write_tree(file, node, prefix, notes, condensation_threshold):
+def classify_files(all_files, is_img_dir, condensation_threshold):
     """
-    Escribe la estructura del árbol en el archivo
-    con una visualización jerárquica correcta y condensada
+    Aplica la estrategia de condensación de un directorio.
+    Devuelve (si se condensa, patrones condensados).
     """
-    # Ordenar directorios y archivos para una visualización consistente
-    dirs = sorted(node['dirs'].keys())
+    # Directorios por debajo de cualquier umbral: no hace falta analizarlos
+    if len(all_files) < min(condensation_threshold, 5):
+        return False, {}
     
-    # Determinar si es un directorio de imágenes
-    is_img_dir = node['is_img_dir']
-    
-    # Preparar la condensación
-    all_files = node['all_files']
-    condensed_patterns = {}
+    # Una sola pasada de análisis para todas las estrategias
+    analysis = DirectoryAnalysis(all_files)
     
     # Aplicar diferentes estrategias según el tipo de directorio
     if is_img_dir:
         # Si es un directorio de imágenes, usar un umbral más bajo
-        if should_condense(all_files, condensation_threshold, is_img_dir=True):
-            condensed_patterns = condense_image_directory(all_files)
-    elif should_condense(all_files, condensation_threshold):
-        condensed_patterns = analyze_patterns(all_files)
+        if should_condense(all_files, condensation_threshold, is_img_dir=True, analysis=analysis):
+            return True, condense_image_directory(all_files, analysis)
+    elif should_condense(all_files, condensation_threshold, analysis=analysis):
+        return True, analyze_patterns(all_files, analysis)
+    return False, {}
+
+def classify_tree(node, condensation_threshold):
+    """Calcula por adelantado los patrones condensados de todos los directorios del árbol"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.patterns is None:
+            _, current.patterns = classify_files(current.files, current.is_img_dir, condensation_threshold)
+        stack.extend(current.dirs.values())
+
+def plan_directory(node, condensation_threshold):
+    """
+    Decide cómo se muestran los archivos de un directorio.
+    Devuelve los patrones condensados y un diccionario con los
+    archivos restantes agrupados por nombre base.
+    """
+    # Reutilizar la clasificación si ya se calculó (por ejemplo, desde la caché)
+    condensed_patterns = node.patterns
+    if condensed_patterns is None:
+        _, condensed_patterns = classify_files(node.files, node.is_img_dir, condensation_threshold)
     
     # Eliminar archivos ya condensados
     condensed_files = set()
     for pattern_files in condensed_patterns.values():
         condensed_files.update(pattern_files)
     
-    # Actualizar los grupos de archivos - mantenemos esto como diccionario
-    file_dict = {}
-    for base, files in node['files'].items():
-        remaining = [f for f in files if f not in condensed_files]
-        if remaining:
-            file_dict[base] = remaining
+    # Agrupar los archivos restantes por nombre base (sin extensión)
+    file_dict = defaultdict(list)
+    for f in node.files:
+        if f not in condensed_files:
+            file_dict[get_base_name(f)].append(f)
+    
+    return condensed_patterns, file_dict
+
+def iter_node_lines(node, dirs, prefix, notes, condensation_threshold, render_dir, annotator=None, profiler=None,
+                    rel=''):
+    """
+    Genera las líneas de un directorio ya ordenado.
+    render_dir(nombre, nuevo_prefijo) devuelve lo que va tras la línea del subdirectorio:
+    sus líneas o, para _flatten_lines, una tupla con el iterador de sus líneas.
+    annotator, si se indica, añade información a cada línea (ver SizeAnnotator);
+    las notas se siguen buscando sobre la línea sin anotar.
+    Con un Profiler, la clasificación se atribuye a rel, la ruta relativa del directorio.
+    """
+    if node.summary is not None:
+        # Directorio que superó los límites: una sola línea con los totales
+        # (nada si está vacío, igual que sin límites)
+        if node.summary.files or node.summary.dirs:
+            yield f"{prefix}└── {node.summary.label()}"
+        return
+    
+    plan = plan_directory
+    if profiler is not None:
+        plan = profiler.wrap('plan_directory', plan_directory, 'clasificar', rel)
+    condensed_patterns, file_dict = plan(node, condensation_threshold)
     
     # Usamos una lista ordenada de las claves del diccionario
     file_groups = sorted(file_dict.keys())
@@ -215,19 +2787,20 @@ def write_tree(file, node, prefix, notes, condensation_threshold):
     current_item = 0
     
     # Escribir directorios
-    for idx, dir_name in enumerate(dirs):
+    for dir_name in dirs:
         current_item += 1
         is_last = current_item == total_items
         
+        label = annotator.dir_label(node.dirs.get(dir_name)) if annotator is not None else ''
         if is_last and total_items > 0:
-            file.write(f"{prefix}└── {dir_name}/\n")
+            yield f"{prefix}└── {dir_name}/{label}"
             new_prefix = prefix + "    "
         else:
-            file.write(f"{prefix}├── {dir_name}/\n")
+            yield f"{prefix}├── {dir_name}/{label}"
             new_prefix = prefix + "│   "
         
         # Recursivamente escribir el contenido del directorio
-        write_tree(file, node['dirs'][dir_name], new_prefix, notes, condensation_threshold)
+        yield from render_dir(dir_name, new_prefix)
     
     # Escribir patrones condensados
     for pattern, files in condensed_patterns.items():
@@ -235,32 +2808,867 @@ def write_tree(file, node, prefix, notes, condensation_threshold):
         is_last = current_item == total_items
         
         count = len(files)
+        label = annotator.pattern_label(node, files) if annotator is not None else ''
         if is_last:
-            line = f"{prefix}└── {pattern} ({count} archivos)"
+            yield f"{prefix}└── {pattern} ({count} archivos){label}"
         else:
-            line = f"{prefix}├── {pattern} ({count} archivos)"
-        
-        # Añadir nota si existe
-        file.write(f"{line}\n")
+            yield f"{prefix}├── {pattern} ({count} archivos){label}"
+    
+    # Las notas compiladas se consultan directamente, sin pasar por add_note
+    if isinstance(notes, NoteMatcher):
+        find_note = notes.match
+    else:
+        def find_note(line):
+            return match_note(line, notes)
+    if profiler is not None:
+        find_note = profiler.wrap('NoteMatcher.match', find_note)
     
-    # Escribir grupos de archivos individuales - ahora usando correctamente el diccionario
+    # Escribir grupos de archivos individuales; las ramas se forman una vez por directorio
+    branch = f"{prefix}├── "
     for base_name in file_groups:
-        files = sorted(file_dict[base_name])  # Usamos file_dict en lugar de file_groups
+        files = sorted(file_dict[base_name])
             
-        for file_idx, filename in enumerate(files):
+        for filename in files:
             current_item += 1
             is_last_file = current_item == total_items
             
             if is_last_file:
                 line = f"{prefix}└── {filename}"
             else:
-                line = f"{prefix}├── {filename}"
+                line = branch + filename
             
             # Añadir nota si existe
-            line_with_note = add_note(line, notes)
-            file.write(f"{line_with_note}\n")
+            note = find_note(line)
+            if annotator is not None:
+                line += annotator.file_label(node, filename)
+            yield f"{line} {note}" if note is not None else line
+
+# Líneas que se acumulan antes de cada escritura en el archivo de salida
+WRITE_BATCH_LINES = 8192
+
+def _flatten_lines(lines):
+    """
+    Recorre las líneas de un árbol sin recursión. Los render_dir de
+    iter_tree_lines e iter_tree_lines_streaming no devuelven las líneas del
+    subdirectorio sino su iterador, que aquí se apila: cada línea pasa por
+    un solo generador, sea cual sea la profundidad, y no hay límite de niveles.
+    """
+    stack = [iter(lines)]
+    while stack:
+        for item in stack[-1]:
+            if type(item) is str:
+                yield item
+            else:
+                stack.append(item)
+                break
+        else:
+            stack.pop()
+
+def iter_tree_lines(node, prefix, notes, condensation_threshold, annotator=None, profiler=None):
+    """Genera las líneas del árbol completo a partir de un nodo en memoria"""
+    def lines_of(current, current_prefix, rel):
+        def render_dir(dir_name, new_prefix):
+            child_rel = f"{rel}/{dir_name}" if rel else dir_name
+            return (lines_of(current.dirs[dir_name], new_prefix, child_rel),)
+        return iter_node_lines(current, sorted(current.dirs), current_prefix, notes, condensation_threshold,
+                               render_dir, annotator, profiler, rel)
+    
+    return _flatten_lines(lines_of(node, prefix, ''))
+
+def write_lines(file, lines):
+    """Escribe las líneas en bloques de WRITE_BATCH_LINES, con una sola llamada a write por bloque"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == WRITE_BATCH_LINES:
+            batch.append('')
+            file.write('\n'.join(batch))
+            batch = []
+    if batch:
+        batch.append('')
+        file.write('\n'.join(batch))
+
+def write_tree(file, node, prefix, notes, condensation_threshold, annotator=None, profiler=None):
+    """
+    Escribe la estructura del árbol en el archivo
+    con una visualización jerárquica correcta y condensada
+    """
+    write_lines(file, iter_tree_lines(node, prefix, notes, condensation_threshold, annotator, profiler))
+
+# Subdirectorios hermanos que el modo streaming lista por adelantado
+STREAM_READ_AHEAD = 32
+
+def _is_readable(path):
+    """Comprueba que el directorio se puede abrir, sin leer su listado"""
+    try:
+        with os.scandir(path):
+            return True
+    except OSError:
+        return False
+
+def _stream_directory(path, rel, listing, prefix, notes, condensation_threshold, exclude_dirs, pool, gitignore,
+                      depth=0, max_depth=None, max_items=None, profiler=None):
+    """
+    Genera las líneas de un directorio sin conservar el árbol completo.
+    Antes de escribir el directorio solo se comprueba qué subdirectorios se
+    pueden abrir (hace falta para dibujar el último elemento). El listado de
+    cada uno se pide al pool poco antes de mostrarlo, con a lo sumo
+    STREAM_READ_AHEAD hermanos por delante, y se libera en cuanto termina.
+    """
+    if isinstance(listing, TreeSummary):
+        return iter_node_lines(_summary_node(listing), [], prefix, notes, condensation_threshold, None)
+    
+    dirs, files, _, _, chain, _, _ = listing
+    node = build_node(files)
+    
+    names = sorted(_child_dirs(dirs, rel, chain, exclude_dirs))
+    count_only = max_depth is not None and depth + 1 >= max_depth
+    if not count_only:
+        # count_tree siempre devuelve totales; los listados pueden fallar
+        readable = pool.map(_is_readable, [os.path.join(path, d) for d in names])
+        names = [name for name, ok in zip(names, readable) if ok]
+    
+    def read(dir_name):
+        child_rel = f"{rel}/{dir_name}" if rel else dir_name
+        return child_rel, _read_within_budget(os.path.join(path, dir_name), child_rel, chain, None, gitignore,
+                                              False, exclude_dirs, count_only, max_items, profiler)
+    
+    pending = {}
+    upcoming = iter(names)
+    
+    def render_dir(dir_name, new_prefix):
+        # Mantener la ventana de lecturas por delante del subdirectorio que se muestra
+        for next_name in upcoming:
+            pending[next_name] = pool.submit(read, next_name)
+            if len(pending) > STREAM_READ_AHEAD:
+                break
+        child_rel, child = pending.pop(dir_name).result()
+        if child is None:
+            # Dejó de poder leerse después de la comprobación: se muestra vacío
+            return ()
+        # El iterador del subdirectorio lo apila _flatten_lines
+        return (_stream_directory(os.path.join(path, dir_name), child_rel, child, new_prefix,
+                                  notes, condensation_threshold, exclude_dirs, pool, gitignore,
+                                  depth + 1, max_depth, max_items, profiler),)
+    
+    return iter_node_lines(node, names, prefix, notes, condensation_threshold, render_dir, None, profiler, rel)
+
+def iter_tree_lines_streaming(start_path, exclude_dirs, notes, condensation_threshold, max_workers=None, gitignore=False,
+                              max_depth=None, max_items=None, profiler=None):
+    """
+    Recorre y renderiza el árbol a la vez, sin construirlo en memoria.
+    
+    Cada subárbol se genera y se libera en cuanto se termina de recorrer, y
+    cada nivel conserva como mucho STREAM_READ_AHEAD listados de hermanos
+    leídos por adelantado, así que la memoria máxima depende de la
+    profundidad y del tamaño de esos directorios, no del total de archivos.
+    La salida es la misma que la de write_tree.
+    """
+    read = _read_directory
+    if profiler is not None:
+        read = profiler.wrap('_read_directory', _read_directory, 'listar', '')
+    listing = read(start_path, '', _root_chain(start_path, gitignore), None, gitignore, True, False, profiler)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        yield from _flatten_lines(_stream_directory(start_path, '', listing, '', notes, condensation_threshold,
+                                                    exclude_dirs, pool, gitignore, 0, max_depth, max_items, profiler))
+
+SNAPSHOT_VERSION = 2
+
+def snapshot_tree(root_node, condensation_threshold):
+    """
+    Convierte un árbol de nodos en un diccionario plano serializable para
+    --snapshot, indexado por ruta relativa ('' para la raíz).
+    
+    Cada directorio guarda sus archivos (ordenados), los patrones condensados
+    con su número de archivos, los nombres de sus subdirectorios y un resumen
+    tipo Merkle (SHA-1 sobre nombres, patrones y resúmenes de los hijos): dos
+    subárboles con el mismo resumen son idénticos y el diff no necesita entrar
+    en ellos. Los resúmenes se calculan de abajo arriba sin recursión, así que
+    la profundidad del árbol no tiene límite.
+    """
+    # Orden en preorden; recorrido al revés, cada hijo se procesa antes que su padre
+    order = []
+    stack = [(root_node, '')]
+    while stack:
+        node, rel = stack.pop()
+        order.append((node, rel))
+        prefix = f"{rel}/" if rel else ''
+        stack.extend((child, prefix + name) for name, child in node.dirs.items())
+    
+    entries = {}
+    for node, rel in reversed(order):
+        patterns, _ = plan_directory(node, condensation_threshold)
+        entry = {
+            'files': sorted(node.files),
+            'patterns': {pattern: len(files) for pattern, files in sorted(patterns.items())},
+            'dirs': sorted(node.dirs),
+        }
+        
+        digest = hashlib.sha1()
+        for name in entry['files']:
+            digest.update(f"f\0{name}\n".encode('utf-8', 'surrogateescape'))
+        for pattern, count in entry['patterns'].items():
+            digest.update(f"p\0{pattern}\0{count}\n".encode('utf-8', 'surrogateescape'))
+        if node.summary is not None:
+            entry['summary'] = [node.summary.files, node.summary.dirs, node.summary.bytes]
+            digest.update(f"s\0{node.summary.files}\0{node.summary.dirs}\0{node.summary.bytes}\n".encode('ascii'))
+        prefix = f"{rel}/" if rel else ''
+        for name in entry['dirs']:
+            digest.update(f"d\0{name}\0{entries[prefix + name]['digest']}\n".encode('utf-8', 'surrogateescape'))
+        entry['digest'] = digest.hexdigest()
+        entries[rel] = entry
+    return entries
+
+def build_snapshot(root_node, condensation_threshold):
+    """Instantánea completa: los directorios más la versión del formato y el umbral usado"""
+    return {'version': SNAPSHOT_VERSION, 'threshold': condensation_threshold,
+            'dirs': snapshot_tree(root_node, condensation_threshold)}
+
+def write_snapshot(snapshot, output_file):
+    """Guarda una instantánea en JSON compacto"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+
+def load_snapshot(snapshot_file, condensation_threshold=None):
+    """
+    Lee una instantánea guardada por write_snapshot. Con condensation_threshold,
+    comprueba además que se generó con el mismo umbral.
+    """
+    with open(snapshot_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"'{snapshot_file}' no es una instantánea compatible (versión {data.get('version')})")
+    if condensation_threshold is not None and data.get('threshold') != condensation_threshold:
+        raise ValueError(f"'{snapshot_file}' se generó con umbral {data.get('threshold')} y ahora se usa "
+                         f"{condensation_threshold}; compara con el mismo umbral o genera una instantánea nueva")
+    return data
+
+def _snapshot_file_count(entries, rel):
+    """Archivos del subárbol rel de una instantánea, incluidos los solo contados"""
+    total = 0
+    stack = [rel]
+    while stack:
+        current_rel = stack.pop()
+        current = entries[current_rel]
+        total += len(current['files'])
+        if 'summary' in current:
+            total += current['summary'][0]
+        stack.extend(f"{current_rel}/{name}" for name in current['dirs'])
+    return total
+
+def diff_snapshots(old, new):
+    """
+    Compara dos instantáneas y devuelve los cambios ordenados por ruta, como
+    tuplas (tipo, ruta, detalle):
+    
+    - ('added' | 'removed', ruta, None) para archivos
+    - ('added' | 'removed', 'ruta/', archivos del subárbol) para directorios
+    - ('condensation', ruta del patrón o 'ruta/…', (antes, después)) cuando cambia
+      el número de archivos de un patrón condensado o de un directorio resumido
+    
+    Los subárboles con el mismo resumen se saltan sin recorrerlos, así que el
+    coste depende del tamaño de los cambios y no del árbol. Las dos
+    instantáneas deben usar el mismo umbral: con otro, los patrones
+    condensados y los resúmenes cambian aunque los archivos sean los mismos.
+    """
+    if old.get('threshold') != new.get('threshold'):
+        raise ValueError(f"Las instantáneas usan umbrales distintos ({old.get('threshold')} y "
+                         f"{new.get('threshold')}) y no se pueden comparar")
+    old_entries, new_entries = old['dirs'], new['dirs']
+    changes = []
+    stack = ['']
+    while stack:
+        rel = stack.pop()
+        before, after = old_entries[rel], new_entries[rel]
+        if before['digest'] == after['digest']:
+            continue
+        prefix = f"{rel}/" if rel else ''
+        
+        old_files, new_files = set(before['files']), set(after['files'])
+        changes.extend(('added', prefix + name, None) for name in new_files - old_files)
+        changes.extend(('removed', prefix + name, None) for name in old_files - new_files)
+        
+        old_patterns, new_patterns = before['patterns'], after['patterns']
+        for pattern in old_patterns.keys() | new_patterns.keys():
+            counts = (old_patterns.get(pattern, 0), new_patterns.get(pattern, 0))
+            if counts[0] != counts[1]:
+                changes.append(('condensation', prefix + pattern, counts))
+        
+        old_summary, new_summary = before.get('summary'), after.get('summary')
+        if old_summary != new_summary:
+            counts = (old_summary[0] if old_summary else 0, new_summary[0] if new_summary else 0)
+            changes.append(('condensation', f"{prefix}…", counts))
+        
+        old_dirs, new_dirs = set(before['dirs']), set(after['dirs'])
+        for name in new_dirs - old_dirs:
+            changes.append(('added', f"{prefix}{name}/", _snapshot_file_count(new_entries, prefix + name)))
+        for name in old_dirs - new_dirs:
+            changes.append(('removed', f"{prefix}{name}/", _snapshot_file_count(old_entries, prefix + name)))
+        stack.extend(prefix + name for name in old_dirs & new_dirs)
+    
+    changes.sort(key=lambda change: change[1])
+    return changes
+
+def format_snapshot_diff(changes):
+    """Líneas legibles del diff: + añadido, - eliminado, ~ condensación cambiada"""
+    lines = []
+    for kind, path, detail in changes:
+        if kind == 'condensation':
+            lines.append(f"~ {path} ({detail[0]} → {detail[1]} archivos)")
+        else:
+            sign = '+' if kind == 'added' else '-'
+            lines.append(f"{sign} {path}" if detail is None else f"{sign} {path} ({detail} archivos)")
+    return lines
+
+# Eventos de inotify (<sys/inotify.h>) que cambian el listado de un directorio
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """
+    Vigila directorios con inotify a través de ctypes, sin dependencias.
+    
+    Cada directorio del árbol tiene su propio watch; wait() devuelve las rutas
+    relativas de los directorios cuyo listado cambió. Si la cola del kernel se
+    desborda, o cambia un .gitignore cuando se aplican sus reglas (gitignore=True),
+    activa needs_rescan para que el llamador vuelva a recorrer el árbol entero.
+    """
+    MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+            | IN_CLOSE_WRITE | IN_ONLYDIR)
+    
+    def __init__(self, gitignore=False):
+        import ctypes
+        import ctypes.util
+        
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self.watches = {}
+        self.paths = {}
+        self.ignored_names = set()
+        self.needs_rescan = False
+        self.gitignore = gitignore
+    
+    def add(self, rel, path):
+        """
+        Empieza a vigilar un directorio; los que desaparecieron por el camino se omiten.
+        Si se agotan los watches del usuario (fs.inotify.max_user_watches) lanza OSError con ENOSPC.
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self.watches[wd] = rel
+            self.paths[rel] = wd
+            return
+        code = self._ctypes.get_errno()
+        if code == errno.ENOSPC:
+            raise OSError(code, "No quedan watches de inotify (fs.inotify.max_user_watches)", path)
+    
+    def remove(self, rel):
+        wd = self.paths.pop(rel, None)
+        if wd is not None and self.watches.get(wd) == rel:
+            del self.watches[wd]
+            self._libc.inotify_rm_watch(self.fd, wd)
+    
+    def acknowledge(self, rel):
+        """Los eventos de la propia salida ya se filtran por nombre"""
+    
+    def wait(self, timeout=None):
+        """Espera eventos como mucho timeout segundos (None = sin límite)"""
+        import select
+        
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, pos)
+                name = data[pos + _INOTIFY_EVENT.size:pos + _INOTIFY_EVENT.size + length].rstrip(b'\0')
+                pos += _INOTIFY_EVENT.size + length
+                
+                if mask & IN_Q_OVERFLOW:
+                    self.needs_rescan = True
+                    continue
+                rel = self.watches.get(wd)
+                if rel is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # El kernel ya retiró el watch (directorio borrado o desmontado)
+                    del self.watches[wd]
+                    self.paths.pop(rel, None)
+                    continue
+                
+                name = os.fsdecode(name)
+                if name == '.gitignore' and self.gitignore:
+                    self.needs_rescan = True
+                elif mask & IN_CLOSE_WRITE or (rel, name) in self.ignored_names:
+                    # Solo interesan los cambios de contenido de los .gitignore
+                    continue
+                changed.add(rel)
+        return changed
+    
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """
+    Alternativa a inotify para otros sistemas: compara cada poll_interval
+    segundos el mtime de los directorios vigilados, que cambia al crear,
+    borrar o renombrar una entrada.
+    """
+    def __init__(self, poll_interval=0.5):
+        self.poll_interval = poll_interval
+        self.mtimes = {}
+        self.ignored_names = set()
+        self.needs_rescan = False
+    
+    def add(self, rel, path):
+        try:
+            self.mtimes[rel] = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            pass
+    
+    def remove(self, rel):
+        self.mtimes.pop(rel, None)
+    
+    def acknowledge(self, rel):
+        """Toma como referencia el mtime actual (tras escribir la salida dentro del árbol)"""
+        if rel in self.mtimes:
+            self.add(rel, self.mtimes[rel][0])
+    
+    def wait(self, timeout=None):
+        """Comprueba los directorios; sin timeout repite hasta encontrar cambios"""
+        while True:
+            time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+            changed = set()
+            for rel, (path, mtime_ns) in list(self.mtimes.items()):
+                try:
+                    current = os.stat(path).st_mtime_ns
+                except OSError:
+                    current = None
+                if current != mtime_ns:
+                    changed.add(rel)
+                    if current is None:
+                        del self.mtimes[rel]
+                    else:
+                        self.mtimes[rel] = (path, current)
+            if changed or timeout is not None:
+                return changed
+    
+    def close(self):
+        pass
+
+def create_watcher(poll_interval=0.5, gitignore=False):
+    """Usa inotify en Linux y, si no está disponible, el sondeo de mtimes"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(gitignore)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(poll_interval)
+
+class LiveTree:
+    """
+    Árbol de directorios residente en memoria para el modo --watch.
+    
+    Al cambiar un directorio solo se vuelve a listar ese directorio: su nodo
+    se sustituye conservando los subdirectorios que siguen existiendo, y los
+    nuevos se recorren desde cero. El renderizado guarda, por nodo y prefijo,
+    los trozos de texto entre subdirectorios, de modo que los subárboles que
+    no cambiaron (ni cambió su prefijo) no se vuelven a generar.
+    
+    Si el watcher se queda sin watches de inotify, se sustituye por un
+    PollingWatcher (cada poll_interval segundos) que vigila todo el árbol.
+    """
+    def __init__(self, start_path, exclude_dirs, notes, condensation_threshold, gitignore=False,
+                 max_workers=None, watcher=None, poll_interval=0.5):
+        self.start_path = start_path
+        self.exclude_dirs = exclude_dirs
+        self.notes = notes
+        self.condensation_threshold = condensation_threshold
+        self.gitignore = gitignore
+        self.max_workers = max_workers
+        self.watcher = watcher
+        self.poll_interval = poll_interval
+        self.root_name = os.path.basename(os.path.abspath(start_path))
+        self.rebuild()
+    
+    def rebuild(self):
+        """Recorre el árbol completo y vuelve a registrar todos los directorios"""
+        self.root = walk_directory_tree(self.start_path, self.exclude_dirs, self.max_workers, gitignore=self.gitignore)
+        self.nodes = {}
+        self.chains = {}
+        self.segments = {}
+        self._register('', self.root)
+    
+    def path_for(self, rel):
+        return os.path.join(self.start_path, *rel.split('/')) if rel else self.start_path
+    
+    def _watch(self, rel):
+        """Añade el watch de un directorio; sin watches de inotify libres pasa al sondeo de mtimes"""
+        if self.watcher is None:
+            return
+        try:
+            self.watcher.add(rel, self.path_for(rel))
+        except OSError as exc:
+            if exc.errno != errno.ENOSPC:
+                raise
+            print(f"Aviso: {exc.strerror}; se vigilan los cambios comparando mtimes cada {self.poll_interval} s",
+                  file=sys.stderr)
+            polling = PollingWatcher(self.poll_interval)
+            polling.ignored_names = self.watcher.ignored_names
+            self.watcher.close()
+            self.watcher = polling
+            for known in self.nodes:
+                polling.add(known, self.path_for(known))
+            polling.add(rel, self.path_for(rel))
+    
+    def _register(self, rel, node):
+        stack = [(rel, node)]
+        while stack:
+            rel, node = stack.pop()
+            self.nodes[rel] = node
+            self._watch(rel)
+            for name, child in node.dirs.items():
+                stack.append((f"{rel}/{name}" if rel else name, child))
+    
+    def _forget(self, rel):
+        """Retira un subárbol que ya no existe"""
+        stack = [(rel, self.nodes.pop(rel, None))]
+        while stack:
+            rel, node = stack.pop()
+            if node is None:
+                continue
+            self.segments.pop(node, None)
+            self.chains.pop(rel, None)
+            if self.watcher is not None:
+                self.watcher.remove(rel)
+            for name in node.dirs:
+                child_rel = f"{rel}/{name}"
+                stack.append((child_rel, self.nodes.pop(child_rel, None)))
+    
+    def _chain(self, rel):
+        """Reglas .gitignore que se aplican a los archivos de rel (incluidas las suyas)"""
+        if not self.gitignore:
+            return ()
+        # Subir hasta el primer ancestro con las reglas ya calculadas y bajar desde él
+        missing = []
+        chain = self.chains.get(rel)
+        while chain is None:
+            missing.append(rel)
+            if not rel:
+                chain = _root_chain(self.start_path, True)
+                break
+            rel = rel.rpartition('/')[0]
+            chain = self.chains.get(rel)
+        for rel in reversed(missing):
+            rules = GitIgnoreRules.from_file(os.path.join(self.path_for(rel), '.gitignore'), rel)
+            if rules is not None:
+                chain = chain + (rules,)
+            self.chains[rel] = chain
+        return chain
+    
+    def _walk_new(self, rel, parent_chain):
+        """
+        Recorre un subdirectorio nuevo con una pila explícita, sin límite de
+        profundidad; cada watch se añade antes de listar su directorio para no perder eventos.
+        """
+        top = None
+        stack = [(rel, parent_chain, None, None)]
+        while stack:
+            rel, parent_chain, parent, name = stack.pop()
+            path = self.path_for(rel)
+            self._watch(rel)
+            listing = _read_directory(path, rel, parent_chain, gitignore=self.gitignore)
+            if listing is None:
+                if self.watcher is not None:
+                    self.watcher.remove(rel)
+                continue
+            
+            dirs, files, _, _, chain, _, _ = listing
+            node = build_node(files)
+            self.nodes[rel] = node
+            self.chains[rel] = chain
+            if parent is None:
+                top = node
+            else:
+                parent.dirs[sys.intern(name)] = node
+            for child_name in reversed(_child_dirs(dirs, rel, chain, self.exclude_dirs)):
+                stack.append((f"{rel}/{child_name}" if rel else child_name, chain, node, child_name))
+        return top
+    
+    def refresh(self, rel):
+        """Vuelve a listar un directorio cambiado y sustituye su nodo en el árbol"""
+        old = self.nodes.get(rel)
+        if old is None:
+            # Ya se retiró (o se recorrió de nuevo) al actualizar un ancestro
+            return
+        parent_rel, _, name = rel.rpartition('/')
+        parent_chain = self._chain(parent_rel) if rel else _root_chain(self.start_path, self.gitignore)
+        
+        listing = _read_directory(self.path_for(rel), rel, parent_chain, gitignore=self.gitignore, strict=not rel)
+        if listing is None:
+            self._forget(rel)
+            self.nodes[parent_rel].dirs.pop(name, None)
+            self.segments.pop(self.nodes[parent_rel], None)
+            return
+        
+        dirs, files, _, _, chain, _, _ = listing
+        self.chains[rel] = chain
+        node = build_node(files)
+        children = _child_dirs(dirs, rel, chain, self.exclude_dirs)
+        
+        # Primero se retiran los desaparecidos: un directorio renombrado
+        # conserva su inodo, e inotify reutiliza el mismo watch para él
+        kept = set(children)
+        for child_name in old.dirs:
+            if child_name not in kept:
+                self._forget(f"{rel}/{child_name}" if rel else child_name)
+        
+        for child_name in children:
+            child = old.dirs.get(child_name)
+            if child is None:
+                child = self._walk_new(f"{rel}/{child_name}" if rel else child_name, chain)
+            if child is not None:
+                node.dirs[sys.intern(child_name)] = child
+        
+        self.segments.pop(old, None)
+        self.nodes[rel] = node
+        if rel:
+            self.nodes[parent_rel].dirs[name] = node
+        else:
+            self.root = node
+    
+    def _node_segments(self, node, prefix):
+        """
+        Texto propio del nodo, partido por los subdirectorios: [str, (nombre, prefijo), str, ...].
+        Los subdirectorios se guardan por nombre para que sustituir un hijo no invalide al padre.
+        """
+        cached = self.segments.get(node)
+        if cached is not None and cached[0] == prefix:
+            return cached[1]
+        
+        parts = []
+        buffer = []
+        def render_dir(dir_name, new_prefix):
+            return ((dir_name, new_prefix),)
+        
+        for item in iter_node_lines(node, sorted(node.dirs), prefix, self.notes, self.condensation_threshold, render_dir):
+            if isinstance(item, tuple):
+                parts.append(''.join(buffer))
+                parts.append(item)
+                buffer = []
+            else:
+                buffer.append(f"{item}\n")
+        parts.append(''.join(buffer))
+        
+        self.segments[node] = (prefix, parts)
+        return parts
+    
+    def render(self):
+        """Devuelve el contenido completo del archivo de salida"""
+        out = [f"{self.root_name}/\n"]
+        stack = [(self.root, iter(self._node_segments(self.root, '')))]
+        while stack:
+            node, parts = stack[-1]
+            for part in parts:
+                if isinstance(part, str):
+                    out.append(part)
+                else:
+                    child = node.dirs[part[0]]
+                    stack.append((child, iter(self._node_segments(child, part[1]))))
+                    break
+            else:
+                stack.pop()
+        return ''.join(out)
+
+def _write_atomically(output_file, content):
+    """Escribe en un temporal oculto y lo renombra, para que nadie lea el archivo a medias"""
+    directory, name = os.path.split(output_file)
+    tmp_file = os.path.join(directory, f".{name}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_file, output_file)
+
+def watch_directory_tree(start_path='.', output_file='directory_structure.txt', exclude_dirs=None, notes=None,
+                         condensation_threshold=10, gitignore=False, max_workers=None, debounce=0.05,
+                         poll_interval=0.5):
+    """
+    Mantiene output_file actualizado mientras cambian los archivos de start_path.
+    
+    Tras el primer recorrido el árbol queda en memoria; cada ráfaga de eventos
+    se agrupa hasta que pasan debounce segundos sin cambios, se actualizan
+    solo los directorios afectados y se reescribe la salida. Termina con Ctrl+C.
+    """
+    if exclude_dirs is None:
+        exclude_dirs = list(DEFAULT_EXCLUDE_DIRS)
+    if notes is None:
+        notes = {}
+    if not isinstance(notes, NoteMatcher):
+        notes = NoteMatcher(notes)
+    
+    # La propia salida (y su temporal) pueden estar dentro del árbol vigilado
+    output_dir = os.path.relpath(os.path.dirname(os.path.abspath(output_file)), os.path.abspath(start_path))
+    output_rel = '' if output_dir == '.' else output_dir.replace(os.sep, '/')
+    output_name = os.path.basename(output_file)
+    ignored_names = {(output_rel, output_name), (output_rel, f".{output_name}.tmp")}
+    
+    watcher = create_watcher(poll_interval, gitignore)
+    watcher.ignored_names.update(ignored_names)
+    live = LiveTree(start_path, exclude_dirs, notes, condensation_threshold, gitignore, max_workers, watcher,
+                    poll_interval)
+    
+    content = live.render()
+    _write_atomically(output_file, content)
+    live.watcher.acknowledge(output_rel)
+    print(f"Estructura de directorios guardada en '{output_file}'; vigilando cambios (Ctrl+C para salir)")
+    
+    failed = False
+    try:
+        while True:
+            # LiveTree puede haber cambiado inotify por el sondeo de mtimes
+            watcher = live.watcher
+            changed = watcher.wait()
+            while True:
+                more = watcher.wait(debounce)
+                if not more and not watcher.needs_rescan:
+                    break
+                changed |= more
+                if watcher.needs_rescan:
+                    break
+            
+            started = time.perf_counter()
+            try:
+                if watcher.needs_rescan or failed:
+                    # Tras un error el árbol en memoria puede estar a medias: se recorre entero
+                    watcher.close()
+                    if isinstance(watcher, PollingWatcher):
+                        watcher = PollingWatcher(poll_interval)
+                    else:
+                        watcher = create_watcher(poll_interval, gitignore)
+                    watcher.ignored_names.update(ignored_names)
+                    live.watcher = watcher
+                    live.rebuild()
+                else:
+                    # Los ancestros primero: así los subárboles nuevos no se listan dos veces
+                    for rel in sorted(changed, key=lambda r: (r.count('/') + bool(r), r)):
+                        live.refresh(rel)
+                new_content = live.render()
+            except Exception as exc:
+                failed = True
+                print(f"Error al actualizar la estructura: {exc!r}; se recorrerá de nuevo en el próximo cambio",
+                      file=sys.stderr)
+                continue
+            failed = False
+            
+            if new_content != content:
+                content = new_content
+                _write_atomically(output_file, content)
+                live.watcher.acknowledge(output_rel)
+                print(f"Actualizado en {(time.perf_counter() - started) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        live.watcher.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una estructura de directorios condensada")
+    parser.add_argument('start_path', nargs='?', default='.', help="Directorio a explorar")
+    parser.add_argument('-o', '--output', default='estructura_frontend.txt', help="Archivo de salida")
+    parser.add_argument('--threshold', type=int, default=8, help="Umbral de condensación")
+    parser.add_argument('--workers', type=int, default=None, help="Hilos para listar directorios")
+    parser.add_argument('--stream', action='store_true',
+                        help="Renderiza mientras recorre, con memoria constante respecto al número de archivos")
+    parser.add_argument('--cache', metavar='ARCHIVO', default=None,
+                        help="Caché de directorios para re-escanear solo lo que cambió")
+    parser.add_argument('--gitignore', action='store_true',
+                        help="Respeta los .gitignore del proyecto y no recorre los directorios ignorados")
+    parser.add_argument('--sizes', action='store_true',
+                        help="Anota directorios y archivos con su tamaño, número de archivos y líneas")
+    parser.add_argument('--imports', metavar='ARCHIVO', default=None,
+                        help="Guarda en JSON el grafo de imports de src/, con módulos huérfanos e inalcanzables")
+    parser.add_argument('--imports-cache', metavar='ARCHIVO', default=None,
+                        help="Caché por hash de contenido para el análisis de imports")
+    parser.add_argument('--index', metavar='DIRECTORIO', nargs='?', const='.', default=None,
+                        help="Escribe también los inventarios (all_files.txt, imported_css.txt...) en el mismo recorrido")
+    parser.add_argument('--duplicates', metavar='ARCHIVO', default=None,
+                        help="Guarda en JSON los grupos de archivos con el mismo contenido")
+    parser.add_argument('--mark-duplicates', action='store_true',
+                        help="Marca en el árbol los archivos duplicados con el número de su grupo")
+    parser.add_argument('--snapshot', metavar='ARCHIVO', default=None,
+                        help="Guarda una instantánea del árbol para compararla en otra ejecución")
+    parser.add_argument('--compare', metavar='ARCHIVO', default=None,
+                        help="Compara el árbol con una instantánea anterior; termina con código 1 si hay cambios")
+    parser.add_argument('--lint', metavar='ARCHIVO', default=None,
+                        help="Informe JSON de ESLint; anota cada línea con sus errores y avisos")
+    parser.add_argument('--bundle-stats', metavar='ARCHIVO', default=None,
+                        help="stats.html de rollup-plugin-visualizer; anota cada línea con su peso en el bundle")
+    parser.add_argument('--profile', metavar='ARCHIVO', default=None,
+                        help="Mide fases y directorios, muestra los más lentos y guarda una traza para chrome://tracing")
+    parser.add_argument('--assets', metavar='ARCHIVO', default=None,
+                        help="Inventario de imágenes de public/ y src/assets (formato real, dimensiones, peso)")
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help="Niveles que se muestran bajo la raíz; los directorios más profundos se resumen en una línea")
+    parser.add_argument('--max-items', type=int, default=None,
+                        help="Entradas máximas por directorio; los que tengan más se resumen en una línea")
+    parser.add_argument('--config', metavar='ARCHIVO', default=None,
+                        help="Modo multi-raíz: recorre en paralelo las raíces de un archivo JSON y escribe un índice")
+    parser.add_argument('--watch', action='store_true',
+                        help="Sigue ejecutándose y actualiza la salida cada vez que cambian los archivos")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--git-index', action='store_true',
+                        help="Usa los archivos versionados del .git/index en lugar de recorrer el disco")
+    source.add_argument('--stdin', action='store_true',
+                        help="Lee de la entrada estándar una lista de rutas separadas por saltos de línea")
+    args = parser.parse_args()
+    if args.watch and (args.stream or args.cache or args.sizes or args.imports or args.index is not None
+                       or args.git_index or args.stdin or args.max_depth is not None or args.max_items is not None
+                       or args.duplicates or args.mark_duplicates or args.snapshot or args.compare or args.lint
+                       or args.bundle_stats or args.assets or args.profile):
+        parser.error("--watch solo se puede combinar con --threshold, --workers, --gitignore y -o")
+    
+    # Las mismas combinaciones que rechaza generate_directory_tree, como error de uso
+    from_paths = args.git_index or args.stdin
+    find_duplicates_requested = args.duplicates or args.mark_duplicates
+    if args.stream and (args.cache or args.index is not None or args.imports or args.snapshot or args.compare
+                        or args.lint or args.bundle_stats or args.assets):
+        parser.error("--stream no se puede combinar con --cache, --index, --imports, --snapshot, --compare, "
+                     "--lint, --bundle-stats ni --assets")
+    if from_paths and (args.stream or args.cache):
+        parser.error("--git-index y --stdin no se pueden combinar con --stream ni --cache")
+    if (args.sizes or find_duplicates_requested) and (args.stream or args.cache or from_paths):
+        parser.error("--sizes, --duplicates y --mark-duplicates recorren el disco entero: no se pueden combinar "
+                     "con --stream, --cache, --git-index ni --stdin")
+    if (args.max_depth is not None or args.max_items is not None) and (
+            from_paths or args.index is not None or args.imports or find_duplicates_requested or args.assets
+            or args.lint or args.bundle_stats):
+        parser.error("--max-depth y --max-items no se pueden combinar con --git-index, --stdin, --index, --imports, "
+                     "--duplicates, --mark-duplicates, --assets, --lint ni --bundle-stats")
+    
+    paths = None
+    if args.git_index:
+        paths = read_git_index(args.start_path)
+    elif args.stdin:
+        paths = read_path_list(sys.stdin)
+    
     # Define notas para archivos específicos
     file_notes = {
         r'App\.jsx$': '✅ Componente principal actualizado',
@@ -274,11 +3682,63 @@ if __name__ == "__main__":
     # Directorios a excluir (incluyendo .DS_Store)
     exclude = ['node_modules', 'dist', 'build', '.next', '.cache', 'coverage', '.git', '__pycache__', '.DS_Store']
     
+    if args.config:
+        if (args.watch or args.stream or args.cache or args.sizes or args.imports or args.index is not None
+                or args.git_index or args.stdin or args.duplicates or args.mark_duplicates or args.snapshot
+                or args.compare or args.lint or args.bundle_stats or args.assets or args.profile):
+            parser.error("--config solo se puede combinar con --threshold, --workers, --gitignore, "
+                         "--max-depth y --max-items")
+        generate_from_config(
+            args.config,
+            exclude_dirs=exclude,
+            notes=file_notes,
+            condensation_threshold=args.threshold,
+            gitignore=args.gitignore,
+            max_depth=args.max_depth,
+            max_items=args.max_items,
+            max_workers=args.workers
+        )
+        sys.exit(0)
+    
+    if args.watch:
+        watch_directory_tree(
+            start_path=args.start_path,
+            output_file=args.output,
+            exclude_dirs=exclude,
+            notes=file_notes,
+            condensation_threshold=args.threshold,
+            gitignore=args.gitignore,
+            max_workers=args.workers
+        )
+        sys.exit(0)
+    
     # Generar estructura
-    generate_directory_tree(
-        start_path='.',
-        output_file='estructura_frontend.txt',
+    changes = generate_directory_tree(
+        start_path=args.start_path,
+        output_file=args.output,
         exclude_dirs=exclude,
         notes=file_notes,
-        condensation_threshold=8  # Puedes ajustar este valor
-    )
\ No newline at end of file
+        condensation_threshold=args.threshold,
+        max_workers=args.workers,
+        streaming=args.stream,
+        cache_file=args.cache,
+        paths=paths,
+        gitignore=args.gitignore,
+        index_dir=args.index,
+        imports_file=args.imports,
+        imports_cache=args.imports_cache,
+        max_depth=args.max_depth,
+        max_items=args.max_items,
+        duplicates_file=args.duplicates,
+        mark_duplicates=args.mark_duplicates,
+        snapshot_file=args.snapshot,
+        compare_file=args.compare,
+        lint_report=args.lint,
+        bundle_stats=args.bundle_stats,
+        profile_file=args.profile,
+        assets_file=args.assets,
+        sizes=args.sizes
+    )
+    
+    if changes:
+        sys.exit(1)
\ No newline at end of file